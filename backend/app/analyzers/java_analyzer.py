@@ -1,109 +1,131 @@
-import re
+import sys
+from itertools import islice
 
-def analyze_java(code):
+from ..cache import ResultCache
+from .scanner import MAX_ITEMS, MAX_SCAN, compile_pattern, explain_features, join_phrases, split_summary
+
+_CLASS_RE = compile_pattern(r'class\s+(\w+)')
+# Up to three modifiers, then the return type and the captured method name.
+# A single bounded repeat keeps the pattern free of overlapping optional groups.
+_METHOD_RE = compile_pattern(r'(?:(?:public|private|protected|static)\s+){0,3}\w+\s+(\w+)\s*\([^)]*\)\s*\{')
+
+# Defaults shared by every result; the mutable fields are replaced per call
+_RESULT_TEMPLATE = {
+    "summary": "Java code analysis",
+    "user_friendly_summary": "",
+    "details": "",
+    "full_explanation": "",
+    "functions": [],
+    "classes": [],
+    "variables": [],
+    "imports": [],
+    "language": "java",
+    "metadata": {
+        "model_used": "rule-based",
+        "analysis_type": "rule"
+    }
+}
+
+# Recent results by source digest, so re-submitted code is not analyzed again
+result_cache = ResultCache(maxsize=512)
+
+def analyze_java(code, simple=False):
     """
     Analyze Java code and return a structured explanation.
+    
+    Args:
+        code: The Java source code.
+        simple: If True, use the shorter phrasing of the simplified analyzer.
+    
+    Only the first MAX_SCAN characters of the code are analyzed. Results for
+    recently analyzed code are cached, so re-submitting an unchanged paste
+    returns immediately.
     """
+    if not isinstance(code, str):
+        return _analyze_java(code, simple)
+    
+    key = ResultCache.key(code, simple)
+    result = result_cache.get(key)
+    if result is None:
+        result = _analyze_java(code, simple)
+        result_cache.put(key, result)
+    return result
+
+def _analyze_java(code, simple):
     try:
+        code_scan = code if len(code) <= MAX_SCAN else code[:MAX_SCAN]
+        
         result = {
-            "summary": "Java code analysis",
-            "user_friendly_summary": "",
-            "details": "",
-            "full_explanation": "",
+            **_RESULT_TEMPLATE,
             "functions": [],
             "classes": [],
             "variables": [],
             "imports": [],
-            "language": "java",
-            "metadata": {
-                "model_used": "rule-based",
-                "analysis_type": "rule"
-            }
+            "metadata": dict(_RESULT_TEMPLATE["metadata"])
         }
         
         explanation_parts = []
         features_found = []
         
-        # Analyze classes
-        class_matches = re.finditer(r'class\s+(\w+)', code)
-        classes_found = []
-        for match in class_matches:
-            class_name = match.group(1)
-            classes_found.append(class_name)
-            result["classes"].append({
-                "name": class_name,
-                "type": "class",
-                "description": f"Class '{class_name}'"
-            })
-        
-        if classes_found:
-            if len(classes_found) == 1:
-                explanation_parts.append(f"This defines a Java class called '{classes_found[0]}' that serves as a blueprint for creating objects.")
-            else:
-                explanation_parts.append(f"This defines {len(classes_found)} Java classes: {', '.join(classes_found)} that create different types of objects.")
-            features_found.append("creates object-oriented classes")
-        
-        # Analyze methods
-        method_matches = re.finditer(r'(public|private|protected|static)?\s*(public|private|protected|static)?\s*\w+\s+(\w+)\s*\([^)]*\)\s*\{', code)
-        methods_found = []
-        for match in method_matches:
-            method_name = match.group(3)
-            if method_name not in ['main', 'if', 'for', 'while']:  # Exclude keywords
+        # The full analyzer describes classes and methods by name
+        if not simple:
+            # Analyze classes. Names are interned so repeated identifiers share
+            # one string object across results and compare by identity.
+            classes_found = []
+            for match in islice(_CLASS_RE.finditer(code_scan), MAX_ITEMS):
+                class_name = sys.intern(match.group(1))
+                classes_found.append(class_name)
+                result["classes"].append({
+                    "name": class_name,
+                    "type": "class",
+                    "description": f"Class '{class_name}'"
+                })
+            
+            if classes_found:
+                if len(classes_found) == 1:
+                    explanation_parts.append(f"This defines a Java class called '{classes_found[0]}' that serves as a blueprint for creating objects.")
+                else:
+                    explanation_parts.append(f"This defines {len(classes_found)} Java classes: {', '.join(classes_found)} that create different types of objects.")
+                features_found.append("creates object-oriented classes")
+            
+            # Analyze methods. Matches are found lazily, so the search stops
+            # once MAX_ITEMS methods are collected.
+            method_names = (sys.intern(match.group(1)) for match in _METHOD_RE.finditer(code_scan))
+            methods_found = []
+            for method_name in islice((name for name in method_names if name not in ['main', 'if', 'for', 'while']), MAX_ITEMS):  # Exclude keywords
                 methods_found.append(method_name)
                 result["functions"].append({
                     "name": method_name,
                     "type": "method",
                     "description": f"Method '{method_name}'"
                 })
+            
+            if methods_found:
+                explanation_parts.append(f"This defines {len(methods_found)} method(s) that perform specific operations.")
+                features_found.append("defines reusable methods")
         
-        if methods_found:
-            explanation_parts.append(f"This defines {len(methods_found)} method(s) that perform specific operations.")
-            features_found.append("defines reusable methods")
-        
-        # Check for main method
-        if re.search(r'public\s+static\s+void\s+main', code):
-            explanation_parts.append("This contains a main method that serves as the program's entry point.")
-            features_found.append("serves as a program starting point")
-        
-        # Check for output statements
-        if re.search(r'System\.out\.print', code):
-            explanation_parts.append("This displays output to the console.")
-            features_found.append("displays output to users")
-        
-        # Check for imports
-        if re.search(r'import\s+[\w.]+;', code):
-            explanation_parts.append("This imports external Java libraries or classes.")
-            features_found.append("uses external Java libraries")
-        
-        # Check for control structures
-        if re.search(r'if\s*\(|else|switch', code):
-            explanation_parts.append("This contains conditional logic for decision making.")
-            features_found.append("makes decisions based on conditions")
+        # Basic analysis
+        parts, features = explain_features(code_scan, 'java', simple)
+        explanation_parts.extend(parts)
+        features_found.extend(features)
         
-        if re.search(r'for\s*\(|while\s*\(|do\s*\{', code):
-            explanation_parts.append("This uses loops to repeat operations.")
-            features_found.append("repeats operations multiple times")
+        if simple and not explanation_parts:
+            explanation_parts.append("This appears to be a simple Java code snippet.")
         
         # Create explanations
         full_text = " ".join(explanation_parts) if explanation_parts else "This Java code contains basic programming structures."
         
-        # Create summary (first sentence or 200 chars)
-        sentences = full_text.split('. ')
-        if len(sentences) >= 2:
-            summary = sentences[0] + '.'
-            details = '. '.join(sentences[1:]) if len(sentences) > 1 else ""
+        # Create summary (first sentence or about 200 chars)
+        head, sep, tail = full_text.partition('. ')
+        if not simple and sep:
+            summary = head + '.'
+            details = tail
         else:
-            summary = full_text[:200] + "..." if len(full_text) > 200 else full_text
-            details = full_text[200:] if len(full_text) > 200 else ""
+            summary, details = split_summary(explanation_parts or [full_text])
         
         # Create user-friendly summary
         if features_found:
-            if len(features_found) == 1:
-                user_friendly = f"In simple terms, this Java code {features_found[0]}."
-            elif len(features_found) == 2:
-                user_friendly = f"In simple terms, this Java code {features_found[0]} and {features_found[1]}."
-            else:
-                user_friendly = f"In simple terms, this Java code {', '.join(features_found[:-1])}, and {features_found[-1]}."
+            user_friendly = f"In simple terms, this Java code {join_phrases(features_found)}."
         else:
             user_friendly = "In simple terms, this Java code performs basic programming operations."
         
@@ -1,5 +1,122 @@
 import ast
-import astor
+import inspect
+from collections import deque
+
+from ..cache import ResultCache
+from .scanner import split_summary
+
+# Defaults shared by every result; the mutable fields are replaced per call
+_RESULT_TEMPLATE = {
+    "summary": "",
+    "user_friendly_summary": "",
+    "details": "",
+    "full_explanation": "",
+    "functions": [],
+    "classes": [],
+    "variables": [],
+    "imports": [],
+    "language": "python",
+    "metadata": {
+        "model_used": "rule-based",
+        "analysis_type": "rule"
+    }
+}
+
+# Module-level statements described on their own rather than as main code
+_DEFINITION_TYPES = (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)
+
+# Descriptions of function body statements that need no further inspection
+_BODY_DISPATCH = {
+    ast.Return: "Returns a value.",
+    ast.Assign: "Assigns value(s) to variable(s).",
+    ast.AugAssign: "Updates a variable value.",
+    ast.If: "Contains a conditional (if) statement.",
+    ast.For: "Contains a for loop.",
+    ast.While: "Contains a while loop.",
+    ast.Try: "Contains a try/except block for error handling.",
+    ast.Raise: "Raises an exception.",
+    ast.Assert: "Contains an assertion."
+}
+
+# Parameter phrases for functions with no, one, or several arguments
+_ARG_PHRASES = (
+    " that doesn't require any input parameters",
+    " that takes one input parameter called '{0}'",
+    " that takes {n} input parameters: {joined}"
+)
+
+# Bit flags for what a function body does. The highest flag set picks the
+# phrase from _BODY_PHRASES.
+BODY_STATEMENTS = 1
+BODY_CALLS = 2
+BODY_RETURNS = 4
+
+_BODY_PHRASES = (
+    "",
+    " and performs various operations",
+    " and calls other functions to perform its work",
+    " and returns a calculated result"
+)
+
+# Descriptions of module-level statements that need no further inspection
+_STATEMENT_DISPATCH = {
+    ast.If: "makes decisions using conditional logic",
+    ast.For: "repeats actions using a for loop",
+    ast.While: "repeats actions using a while loop",
+    ast.Try: "handles potential errors safely",
+    ast.With: "Uses a context manager (with statement)."
+}
+
+# Bit flags for the kinds of code found, in the order they are summarized
+HAS_FUNCS = 1
+HAS_CLASSES = 2
+HAS_VARS = 4
+HAS_IMPORTS = 8
+HAS_MAIN = 16
+
+_FEATURE_FLAGS = (
+    (HAS_FUNCS, "defines reusable functions"),
+    (HAS_CLASSES, "creates object-oriented classes"),
+    (HAS_VARS, "stores data in variables"),
+    (HAS_IMPORTS, "uses external libraries"),
+    (HAS_MAIN, "executes main program logic")
+)
+
+# Fields that hold nested statements, in the order ast.iter_child_nodes yields them
+_STATEMENT_FIELDS = ('body', 'handlers', 'orelse', 'finalbody', 'cases')
+
+def _iter_statements(tree):
+    """
+    Yield every statement in the tree in the same breadth-first order as ast.walk.
+    
+    Imports and definitions are always statements, and statements only ever
+    nest inside other statements (or except handlers and match cases), so the
+    walk never needs to descend into expressions.
+    """
+    queue = deque(tree.body)
+    while queue:
+        node = queue.popleft()
+        yield node
+        for field in _STATEMENT_FIELDS:
+            queue.extend(getattr(node, field, ()))
+
+# Recent results by source digest, so re-submitted code is not parsed again
+result_cache = ResultCache(maxsize=512)
+
+def _get_docstring(node):
+    """
+    Return the cleaned docstring of a module, class or function node, or None.
+    
+    Same result as ast.get_docstring, but nodes without a docstring (the common
+    case) are rejected with a couple of attribute checks.
+    """
+    body = node.body
+    if not body or not isinstance(body[0], ast.Expr):
+        return None
+    value = body[0].value
+    if not isinstance(value, ast.Constant) or not isinstance(value.value, str):
+        return None
+    return inspect.cleandoc(value.value)
 
 def analyze_python(code):
     """
@@ -8,188 +125,223 @@ def analyze_python(code):
     Returns:
         Dict with structured explanation including summary, functions, classes, etc.
     """
+    if not isinstance(code, str):
+        return _analyze_python(code)
+    
+    key = ResultCache.key(code)
+    result = result_cache.get(key)
+    if result is None:
+        result = _analyze_python(code)
+        result_cache.put(key, result)
+    return result
+
+def parse_python(code):
+    """
+    Parse Python source into a module AST for analyze_tree.
+    
+    Raises:
+        SyntaxError: If the code cannot be parsed.
+    """
+    # Python 3.13+ can return the constant-folded AST directly, which is
+    # smaller to walk; older versions ignore the missing flag
+    return compile(code, '<unknown>', 'exec', flags=ast.PyCF_ONLY_AST | getattr(ast, 'PyCF_OPTIMIZED_AST', 0), optimize=2)
+
+def _analyze_python(code):
     try:
-        tree = ast.parse(code)
-        
-        # Initialize result structure
-        result = {
-            "summary": "",
-            "user_friendly_summary": "",
-            "details": "",
-            "full_explanation": "",
-            "functions": [],
-            "classes": [],
-            "variables": [],
-            "imports": [],
-            "language": "python",
-            "metadata": {
-                "model_used": "rule-based",
-                "analysis_type": "rule"
-            }
+        return analyze_tree(parse_python(code))
+    except SyntaxError as e:
+        return syntax_error_result(e)
+    except Exception as e:
+        return error_result(e)
+
+def syntax_error_result(e):
+    """
+    Build the result returned for code that cannot be parsed.
+    """
+    return {
+        "summary": f"Python syntax error: {str(e)}",
+        "details": "The code contains syntax errors and cannot be parsed.",
+        "full_explanation": f"Python syntax error at line {e.lineno}: {str(e)}",
+        "functions": [],
+        "classes": [],
+        "variables": [],
+        "imports": [],
+        "language": "python",
+        "metadata": {
+            "model_used": "rule-based",
+            "analysis_type": "rule",
+            "error": True
         }
-        
-        explanation_parts = []
-        
-        # Get file level docstring if exists
-        module_docstring = ast.get_docstring(tree)
-        if module_docstring:
-            explanation_parts.append(f"This Python module includes documentation: '{module_docstring}'")
-        
-        # Process imports
-        imports_found = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                for name in node.names:
-                    import_info = {
-                        "name": name.name,
-                        "alias": name.asname,
-                        "type": "import"
-                    }
-                    imports_found.append(import_info)
-                    result["imports"].append(import_info)
-            elif isinstance(node, ast.ImportFrom):
-                for name in node.names:
-                    import_info = {
-                        "name": f"{node.module}.{name.name}" if node.module else name.name,
-                        "alias": name.asname,
-                        "type": "from_import",
-                        "module": node.module
-                    }
-                    imports_found.append(import_info)
-                    result["imports"].append(import_info)
-                    
-        if imports_found:
-            import_names = [imp["name"] for imp in imports_found]
-            explanation_parts.append(f"The code imports the following modules: {', '.join(import_names)}.")
-        
-        # Process functions
-        functions_found = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                func_info = analyze_function(node)
-                functions_found.append(func_info)
-                result["functions"].append(func_info)
-                
-        if functions_found:
-            func_descriptions = [f["description"] for f in functions_found]
-            explanation_parts.extend(func_descriptions)
-        
-        # Process classes
-        classes_found = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                class_info = analyze_class(node)
-                classes_found.append(class_info)
-                result["classes"].append(class_info)
+    }
+
+def error_result(e):
+    """
+    Build the result returned when analysis fails unexpectedly.
+    """
+    return {
+        "summary": f"Analysis error: {str(e)}",
+        "details": "An error occurred while analyzing the Python code.",
+        "full_explanation": f"Error during analysis: {str(e)}",
+        "functions": [],
+        "classes": [],
+        "variables": [],
+        "imports": [],
+        "language": "python",
+        "metadata": {
+            "model_used": "rule-based",
+            "analysis_type": "rule",
+            "error": True
+        }
+    }
+
+def analyze_tree(tree, memo=None):
+    """
+    Analyze a parsed Python module and return a structured explanation.
+    
+    Args:
+        tree: Module AST from parse_python.
+        memo: Optional dict mapping function and class nodes to their earlier
+            analysis. Nodes found in it are not analyzed again, and new
+            analyses are added to it.
+    
+    Returns:
+        Dict with structured explanation including summary, functions, classes, etc.
+    """
+    # Initialize result structure
+    result = {
+        **_RESULT_TEMPLATE,
+        "functions": [],
+        "classes": [],
+        "variables": [],
+        "imports": [],
+        "metadata": dict(_RESULT_TEMPLATE["metadata"])
+    }
+    
+    explanation_parts = []
+    flags = 0
+    
+    # Get file level docstring if exists
+    module_docstring = _get_docstring(tree)
+    if module_docstring:
+        explanation_parts.append(f"This Python module includes documentation: '{module_docstring}'")
+    
+    # Bind the node types and result lists to locals once; the loops below
+    # run once per statement and would otherwise look each up every time
+    Import, ImportFrom, FunctionDef, ClassDef = ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef
+    Assign, Name = ast.Assign, ast.Name
+    imports, functions, classes, variables = result["imports"], result["functions"], result["classes"], result["variables"]
+    
+    # Process imports, functions and classes in a single traversal
+    for node in _iter_statements(tree):
+        if isinstance(node, Import):
+            for name in node.names:
+                import_info = {
+                    "name": name.name,
+                    "alias": name.asname,
+                    "type": "import"
+                }
+                imports.append(import_info)
+            flags |= HAS_IMPORTS
+        elif isinstance(node, ImportFrom):
+            for name in node.names:
+                import_info = {
+                    "name": f"{node.module}.{name.name}" if node.module else name.name,
+                    "alias": name.asname,
+                    "type": "from_import",
+                    "module": node.module
+                }
+                imports.append(import_info)
+            flags |= HAS_IMPORTS
+        elif isinstance(node, FunctionDef):
+            functions.append(_memoized(memo, node, analyze_function))
+            flags |= HAS_FUNCS
+        elif isinstance(node, ClassDef):
+            classes.append(_memoized(memo, node, analyze_class))
+            flags |= HAS_CLASSES
                 
-        if classes_found:
-            class_descriptions = [c["description"] for c in classes_found]
-            explanation_parts.extend(class_descriptions)
-        
-        # Process main level variables and code
-        main_code_parts = []
-        variables_found = []
-        
-        for node in tree.body:
-            if not isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
-                if isinstance(node, ast.Assign):
-                    for target in node.targets:
-                        if isinstance(target, ast.Name):
-                            var_info = {
-                                "name": target.id,
-                                "type": "variable",
-                                "scope": "module"
-                            }
-                            variables_found.append(var_info)
-                            result["variables"].append(var_info)
-                    main_code_parts.append("Variable assignment at module level.")
-                else:
-                    # Analyze other main-level code
-                    code_desc = analyze_statement(node)
-                    if code_desc:
-                        main_code_parts.append(code_desc)
-        
-        if main_code_parts:
-            # Create more natural main code description
-            if len(main_code_parts) == 1:
-                explanation_parts.append(f"The main code {main_code_parts[0].lower()}")
+    if imports:
+        import_names = ', '.join(imp["name"] for imp in imports)
+        explanation_parts.append(f"The code imports the following modules: {import_names}.")
+    
+    explanation_parts.extend(f["description"] for f in functions)
+    explanation_parts.extend(c["description"] for c in classes)
+    
+    # Process main level variables and code
+    main_code_parts = []
+    
+    definition_types = _DEFINITION_TYPES
+    for node in tree.body:
+        if not isinstance(node, definition_types):
+            if isinstance(node, Assign):
+                for target in node.targets:
+                    if isinstance(target, Name):
+                        variables.append({
+                            "name": target.id,
+                            "type": "variable",
+                            "scope": "module"
+                        })
+                        flags |= HAS_VARS
+                main_code_parts.append("Variable assignment at module level.")
+                flags |= HAS_MAIN
             else:
-                explanation_parts.append(f"The main code {' and '.join(main_code_parts).lower()}")
-        
-        # Create summary and full explanation
-        full_text = " ".join(explanation_parts)
-        
-        # Generate summary (first 2 sentences or first 200 chars)
-        sentences = full_text.split('. ')
-        if len(sentences) >= 2:
-            summary = '. '.join(sentences[:2]) + '.'
-            details = '. '.join(sentences[2:]) if len(sentences) > 2 else ""
+                # Analyze other main-level code
+                code_desc = analyze_statement(node)
+                if code_desc:
+                    main_code_parts.append(code_desc)
+                    flags |= HAS_MAIN
+    
+    if main_code_parts:
+        # Create more natural main code description
+        if len(main_code_parts) == 1:
+            explanation_parts.append(f"The main code {main_code_parts[0].lower()}")
         else:
-            summary = full_text[:200] + "..." if len(full_text) > 200 else full_text
-            details = full_text[200:] if len(full_text) > 200 else ""
-        
-        # Create user-friendly summary
-        features_found = []
-        if functions_found:
-            features_found.append("defines reusable functions")
-        if classes_found:
-            features_found.append("creates object-oriented classes")
-        if variables_found:
-            features_found.append("stores data in variables")
-        if imports_found:
-            features_found.append("uses external libraries")
-        if main_code_parts:
-            features_found.append("executes main program logic")
-        
-        if features_found:
-            if len(features_found) == 1:
-                user_friendly = f"In simple terms, this Python code {features_found[0]}."
-            elif len(features_found) == 2:
-                user_friendly = f"In simple terms, this Python code {features_found[0]} and {features_found[1]}."
-            else:
-                user_friendly = f"In simple terms, this Python code {', '.join(features_found[:-1])}, and {features_found[-1]}."
+            explanation_parts.append(f"The main code {' and '.join(main_code_parts).lower()}")
+    
+    # Create summary and full explanation
+    full_text = " ".join(explanation_parts)
+    
+    # Generate summary (first 2 sentences or about 200 chars)
+    first = full_text.find('. ')
+    second = full_text.find('. ', first + 2) if first != -1 else -1
+    if second != -1:
+        summary = full_text[:second] + '.'
+        details = full_text[second + 2:]
+    elif first != -1:
+        summary = full_text + '.'
+        details = ""
+    else:
+        summary, details = split_summary(explanation_parts)
+    
+    # Create user-friendly summary
+    features_found = [text for flag, text in _FEATURE_FLAGS if flags & flag]
+    
+    if features_found:
+        if len(features_found) == 1:
+            user_friendly = f"In simple terms, this Python code {features_found[0]}."
+        elif len(features_found) == 2:
+            user_friendly = f"In simple terms, this Python code {features_found[0]} and {features_found[1]}."
         else:
-            user_friendly = "In simple terms, this Python code performs basic programming operations."
-        
-        result["summary"] = summary
-        result["user_friendly_summary"] = user_friendly
-        result["details"] = details
-        result["full_explanation"] = full_text
-        
-        return result
-        
-    except SyntaxError as e:
-        return {
-            "summary": f"Python syntax error: {str(e)}",
-            "details": "The code contains syntax errors and cannot be parsed.",
-            "full_explanation": f"Python syntax error at line {e.lineno}: {str(e)}",
-            "functions": [],
-            "classes": [],
-            "variables": [],
-            "imports": [],
-            "language": "python",
-            "metadata": {
-                "model_used": "rule-based",
-                "analysis_type": "rule",
-                "error": True
-            }
-        }
-    except Exception as e:
-        return {
-            "summary": f"Analysis error: {str(e)}",
-            "details": "An error occurred while analyzing the Python code.",
-            "full_explanation": f"Error during analysis: {str(e)}",
-            "functions": [],
-            "classes": [],
-            "variables": [],
-            "imports": [],
-            "language": "python",
-            "metadata": {
-                "model_used": "rule-based",
-                "analysis_type": "rule",
-                "error": True
-            }
-        }
+            user_friendly = f"In simple terms, this Python code {', '.join(features_found[:-1])}, and {features_found[-1]}."
+    else:
+        user_friendly = "In simple terms, this Python code performs basic programming operations."
+    
+    result["summary"] = summary
+    result["user_friendly_summary"] = user_friendly
+    result["details"] = details
+    result["full_explanation"] = full_text
+    
+    return result
+
+def _memoized(memo, node, analyze):
+    """
+    Return analyze(node), reusing and recording it in memo when one is given.
+    """
+    if memo is None:
+        return analyze(node)
+    info = memo.get(node)
+    if info is None:
+        info = memo[node] = analyze(node)
+    return info
 
 def analyze_function(func_node):
     """
@@ -198,41 +350,28 @@ def analyze_function(func_node):
     func_name = func_node.name
     
     # Get function arguments
-    args = []
-    for arg in func_node.args.args:
-        args.append(arg.arg)
+    args = [arg.arg for arg in func_node.args.args]
     
     # Get function docstring
-    docstring = ast.get_docstring(func_node)
+    docstring = _get_docstring(func_node)
     
     # Analyze function body
-    statements = analyze_function_body(func_node.body)
+    statements, body_flags = analyze_function_body(func_node.body)
     
     # Create a more natural description
     if func_name == 'main':
-        description = f"This defines the main function that serves as the program's entry point"
+        parts = ["This defines the main function that serves as the program's entry point"]
     elif func_name.startswith('__'):
-        description = f"This defines a special method '{func_name}' that handles specific object behavior"
-    else:
-        description = f"This defines a function called '{func_name}'"
-        
-    if args:
-        if len(args) == 1:
-            description += f" that takes one input parameter called '{args[0]}'"
-        else:
-            description += f" that takes {len(args)} input parameters: {', '.join(args)}"
+        parts = [f"This defines a special method '{func_name}' that handles specific object behavior"]
     else:
-        description += " that doesn't require any input parameters"
+        parts = [f"This defines a function called '{func_name}'"]
         
+    parts.append(_ARG_PHRASES[min(len(args), 2)].format(*args[:1], n=len(args), joined=', '.join(args)))
+    
     # Add functional description based on statements
-    if 'Returns a value' in statements:
-        description += " and returns a calculated result"
-    elif any('Calls function' in s for s in statements):
-        description += " and calls other functions to perform its work"
-    elif statements:
-        description += " and performs various operations"
+    parts.append(_BODY_PHRASES[body_flags.bit_length()])
     
-    description += "."
+    description = ''.join(parts) + "."
     
     return {
         "name": func_name,
@@ -249,26 +388,21 @@ def analyze_class(class_node):
     class_name = class_node.name
     
     # Get base classes
-    bases = []
-    for base in class_node.bases:
-        if isinstance(base, ast.Name):
-            bases.append(base.id)
+    bases = [base.id for base in class_node.bases if isinstance(base, ast.Name)]
     
     # Get class docstring
-    docstring = ast.get_docstring(class_node)
+    docstring = _get_docstring(class_node)
     
     # Count methods
-    methods = []
-    for node in class_node.body:
-        if isinstance(node, ast.FunctionDef):
-            methods.append(node.name)
+    methods = [node.name for node in class_node.body if isinstance(node, ast.FunctionDef)]
     
-    description = f"Class '{class_name}'"
+    parts = [f"Class '{class_name}'"]
     if bases:
-        description += f" inherits from {', '.join(bases)}"
-    description += f" with {len(methods)} method(s): {', '.join(methods) if methods else 'none'}."
+        parts.append(f" inherits from {', '.join(bases)}")
+    parts.append(f" with {len(methods)} method(s): {', '.join(methods) if methods else 'none'}.")
     if docstring:
-        description += f" Docstring: '{docstring}'"
+        parts.append(f" Docstring: '{docstring}'")
+    description = ''.join(parts)
     
     return {
         "name": class_name,
@@ -281,42 +415,39 @@ def analyze_class(class_node):
 
 def analyze_function_body(body):
     """
-    Analyze the body of a function and return a list of statement descriptions.
+    Analyze the body of a function.
+    
+    Returns:
+        Tuple of the list of statement descriptions and BODY_* flags for
+        what the body does.
     """
     statements = []
+    flags = 0
     
     for node in body:
-        if isinstance(node, ast.Return):
-            statements.append("Returns a value.")
-        elif isinstance(node, ast.Assign):
-            statements.append("Assigns value(s) to variable(s).")
-        elif isinstance(node, ast.AugAssign):
-            statements.append("Updates a variable value.")
-        elif isinstance(node, ast.If):
-            statements.append("Contains a conditional (if) statement.")
-        elif isinstance(node, ast.For):
-            statements.append("Contains a for loop.")
-        elif isinstance(node, ast.While):
-            statements.append("Contains a while loop.")
-        elif isinstance(node, ast.Try):
-            statements.append("Contains a try/except block for error handling.")
-        elif isinstance(node, ast.Raise):
-            statements.append("Raises an exception.")
-        elif isinstance(node, ast.Assert):
-            statements.append("Contains an assertion.")
+        desc = _BODY_DISPATCH.get(type(node))
+        if desc:
+            statements.append(desc)
+            flags |= BODY_RETURNS if type(node) is ast.Return else BODY_STATEMENTS
         elif isinstance(node, ast.Call):
             if isinstance(node.func, ast.Name):
                 statements.append(f"Calls function '{node.func.id}'.")
+                flags |= BODY_CALLS
         elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
             if isinstance(node.value.func, ast.Name):
                 statements.append(f"Calls function '{node.value.func.id}'.")
+                flags |= BODY_CALLS
     
-    return statements
+    return statements, flags
 
 def analyze_statement(node):
     """
     Analyze a statement node and return a description.
     """
+    desc = _STATEMENT_DISPATCH.get(type(node))
+    if desc:
+        return desc
+    
     if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
         func = node.value.func
         if isinstance(func, ast.Name):
@@ -331,15 +462,5 @@ def analyze_statement(node):
                 return f"calls the '{func_name}' function"
         elif isinstance(func, ast.Attribute):
             return "calls a method or function"
-    elif isinstance(node, ast.If):
-        return "makes decisions using conditional logic"
-    elif isinstance(node, ast.For):
-        return "repeats actions using a for loop"
-    elif isinstance(node, ast.While):
-        return "repeats actions using a while loop"
-    elif isinstance(node, ast.Try):
-        return "handles potential errors safely"
-    elif isinstance(node, ast.With):
-        return "Uses a context manager (with statement)."
     
     return "Contains executable code."
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Incremental re-analysis of Python code as it is edited.
+
+An editor sends the full code once to start a session and afterwards only its
+edits. Each session keeps the parsed module, the line span of every top-level
+statement, and the analysis of every function and class. On an edit, only the
+top-level statements whose lines the edit touches are parsed again and spliced
+into the cached module, and functions and classes outside the edit keep their
+earlier analysis. Whenever the changed span cannot be parsed on its own, the
+whole file is parsed again, so the result always matches analyze_python.
+
+Sessions live in the memory of the process that started them. Under a server
+with several worker processes, all requests of a session must reach the same
+worker; see gunicorn.conf.py.
+"""
+
+import ast
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+
+from .python_analyzer import analyze_tree, error_result, parse_python, syntax_error_result
+
+# Sessions kept per process; the least recently used is dropped past this
+MAX_SESSIONS = 256
+
+def _line_starts(code):
+    """
+    Return the offset at which each line of the code starts.
+    """
+    return [0, *accumulate(len(line) + 1 for line in code.split('\n'))]
+
+def _statement_span(node, offset=0):
+    """
+    Return the first and last line of a top-level statement, including its decorators.
+    """
+    decorators = getattr(node, 'decorator_list', None)
+    start = decorators[0].lineno if decorators else node.lineno
+    return (start + offset, node.end_lineno + offset)
+
+class PythonSession:
+    """
+    The code, parsed module and per-node analysis memo of one editing session.
+    
+    Results share their function and class entries with the session memo, so
+    callers must not modify them.
+    """
+    
+    def __init__(self, code: str):
+        self.lock = threading.Lock()
+        self.code = code
+        self.tree = None
+        self.spans = []
+        self.memo = {}
+        
+    def analyze(self):
+        """
+        Parse the whole code again and return its analysis.
+        """
+        self.tree = None
+        self.spans = []
+        self.memo = {}
+        try:
+            self.tree = parse_python(self.code)
+            self.spans = [_statement_span(node) for node in self.tree.body]
+            return analyze_tree(self.tree, self.memo)
+        except SyntaxError as e:
+            return syntax_error_result(e)
+        except Exception as e:
+            return error_result(e)
+            
+    def apply_edits(self, edits, max_length=None):
+        """
+        Apply edits to the code and return the updated analysis.
+        
+        Args:
+            edits: List of {"start", "end", "text"} dicts. Each replaces the
+                characters from start to end of the code as left by the
+                previous edit.
+            max_length: Optional limit on the length of the edited code.
+            
+        Raises:
+            ValueError: If an edit is malformed or out of range, or the edited
+                code is longer than max_length. The session is left unchanged.
+        """
+        old = self.code
+        code = old
+        # Window [lo, hi) of the edited code that differs from the old code
+        lo = hi = None
+        for edit in edits:
+            try:
+                start, end, text = edit["start"], edit["end"], edit["text"]
+            except (TypeError, KeyError):
+                raise ValueError("Each edit must include start, end and text")
+            if type(start) is not int or type(end) is not int or not isinstance(text, str):
+                raise ValueError("Edit start and end must be integers and text a string")
+            if not 0 <= start <= end <= len(code):
+                raise ValueError(f"Edit range {start}-{end} is outside the code")
+            code = code[:start] + text + code[end:]
+            if lo is None:
+                lo, hi = start, start + len(text)
+            else:
+                lo, hi = min(lo, start), max(hi, end) + len(text) - (end - start)
+        if max_length is not None and len(code) > max_length:
+            raise ValueError(f"Code cannot be longer than {max_length} characters")
+            
+        self.code = code
+        if lo is None and self.tree is not None:
+            return analyze_tree(self.tree, self.memo)
+        if self.tree is None or '\r' in old or '\r' in code:
+            return self.analyze()
+        try:
+            if not self._reparse(old, lo, hi - len(code) + len(old)):
+                return self.analyze()
+            return analyze_tree(self.tree, self.memo)
+        except Exception:
+            return self.analyze()
+            
+    def _reparse(self, old, lo, hi):
+        """
+        Re-parse the top-level statements touched by the change to old[lo:hi]
+        and splice them into the cached module.
+        
+        Returns:
+            False if the changed statements cannot be parsed on their own.
+        """
+        starts = _line_starts(old)
+        first = bisect_right(starts, lo)
+        # The line holding hi is included too: a change that ends at a line
+        # start, such as a deleted newline or text inserted before the next
+        # statement, joins or alters that line
+        last = bisect_right(starts, hi)
+        spans = self.spans
+        
+        # Statements i..j-1 touch the changed lines; everything between the
+        # statements before and after them is parsed again
+        i = next((k for k, span in enumerate(spans) if span[1] >= first), len(spans))
+        j = next((k for k in range(i, len(spans)) if spans[k][0] > last), len(spans))
+        # A statement whose last line ends in a backslash continues onto the
+        # first changed line, so it is parsed again with it
+        while i and old.endswith('\\\n', 0, starts[spans[i - 1][1]]):
+            i -= 1
+        region_first = spans[i - 1][1] + 1 if i else 1
+        begin = starts[region_first - 1]
+        end = starts[spans[j][0] - 1] if j < len(spans) else len(old)
+        source = self.code[begin:end + len(self.code) - len(old)]
+        
+        try:
+            body = parse_python(source).body
+        except SyntaxError:
+            return False
+        # A future import is only valid at the top of the file
+        if begin and any(isinstance(node, ast.ImportFrom) and node.module == '__future__' for node in body):
+            return False
+            
+        for node in self.tree.body[i:j]:
+            for child in ast.walk(node):
+                self.memo.pop(child, None)
+        line_shift = source.count('\n') - (spans[j][0] - region_first) if j < len(spans) else 0
+        self.tree.body[i:j] = body
+        self.spans[i:] = [_statement_span(node, region_first - 1) for node in body] + \
+            [(start + line_shift, end + line_shift) for start, end in spans[j:]]
+        return True
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+def start_session(session_id, code):
+    """
+    Start or restart a session with the full code and return its analysis.
+    """
+    session = PythonSession(code)
+    with session.lock:
+        with _sessions_lock:
+            _sessions[session_id] = session
+            _sessions.move_to_end(session_id)
+            if len(_sessions) > MAX_SESSIONS:
+                _sessions.popitem(last=False)
+        return session.analyze()
+
+def edit_session(session_id, edits, max_length=None):
+    """
+    Apply edits to a session's code and return the updated analysis.
+    
+    Returns:
+        The analysis dict, or None if there is no session with this id.
+        
+    Raises:
+        ValueError: If the edits are invalid; see PythonSession.apply_edits.
+    """
+    with _sessions_lock:
+        session = _sessions.get(session_id)
+        if session is None:
+            return None
+        _sessions.move_to_end(session_id)
+    with session.lock:
+        return session.apply_edits(edits, max_length)
@@ -0,0 +1,328 @@
+"""
+Shared pattern scanning for the rule-based analyzers.
+
+Every C++, Java and JavaScript feature pattern lives in ``LANG_PATTERNS`` and
+is compiled once per language at import time. Both the full analyzers and
+their simplified variants describe code from this one table.
+
+When the google-re2 binding is installed, feature detection runs through an
+RE2::Set so every feature pattern is evaluated in a single linear-time pass
+over the code, and capture patterns are compiled with RE2 as well. Without it
+the analyzers fall back to the standard library ``re`` module and search for
+each feature pattern on its own; a combined ``re`` pattern would have to try
+every alternative at every offset, which is slower than separate searches.
+
+Features that are plain literals skip the regex engine entirely and are
+found with substring checks, which run at C memchr speed.
+
+Source code keywords and identifiers are ASCII, so ``re`` patterns are
+compiled with ``re.ASCII``. This skips the Unicode word-character tables and
+gives the word and whitespace classes the same meaning as under RE2.
+"""
+
+import re
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+HAS_RE2 = re2 is not None and hasattr(re2, 'Set')
+
+# Only the first MAX_SCAN characters of a submission are scanned. This bounds
+# the worst-case matching time and memory on very large pastes; anything past
+# the cap is not described.
+MAX_SCAN = 65536
+
+# At most MAX_ITEMS named classes, functions or variables are collected per
+# kind; past that the explanation would not change in any useful way.
+MAX_ITEMS = 64
+
+
+# Feature table per language. Each entry is
+# (name, pattern, verbose phrase, simple phrase, user-friendly feature text).
+# The pattern is a regex or a tuple of literal strings. A phrase of None
+# leaves the feature out of that mode's explanation; entries are described
+# in table order.
+LANG_PATTERNS = {
+    'cpp': [
+        ('include', r'#include\s*[<"]',
+         "This C++ code includes header files.",
+         "This C++ code includes header files.",
+         "uses external C++ libraries"),
+        ('namespace', r'using\s+namespace\s+std;',
+         "This code uses the standard namespace.",
+         "This code uses the standard namespace.",
+         None),
+        ('class', r'class\s+\w+',
+         "This code defines C++ classes.",
+         None,
+         "creates object-oriented classes"),
+        # The simplified analyzer describes structs together with classes
+        ('class_or_struct', r'(?:class|struct)\s+\w+',
+         None,
+         "This code defines classes or structures.",
+         "creates object-oriented classes"),
+        ('main', r'int\s+main\s*\(',
+         "This code contains a main function - the program entry point.",
+         "This code contains a main function (entry point).",
+         "serves as a program starting point"),
+        # Definitions start a line or follow a brace or semicolon, with up to
+        # two qualifiers before the return type (e.g. "static inline int")
+        ('function', r'(?:(?m:^)|[{};])[ \t]*(?:\w+\s+){0,2}\w+\s+\w+\s*\([^)]*\)\s*\{',
+         "This code defines functions.",
+         None,
+         "defines reusable functions"),
+        # The simplified analyzer keeps its looser function pattern
+        ('simple_function', r'\w+\s+\w+\s*\([^)]*\)\s*\{',
+         None,
+         "This code defines functions.",
+         "defines reusable functions"),
+        # The simplified analyzer's narrower conditional and loop patterns,
+        # described before output as it always has
+        ('simple_conditional', r'if\s*\(|switch\s*\(',
+         None,
+         "This code contains conditional logic.",
+         "makes decisions based on conditions"),
+        ('simple_loop', r'for\s*\(|while\s*\(',
+         None,
+         "This code contains loops.",
+         "repeats operations multiple times"),
+        ('output', r'cout\s*<<|printf\s*\(',
+         "This code outputs text to the console.",
+         "This code performs output operations.",
+         "displays output to users"),
+        ('input', r'cin\s*>>|scanf\s*\(',
+         "This code reads input from users.",
+         None,
+         "gets information from users"),
+        ('conditional', r'if\s*\(|else|switch',
+         "This code contains conditional logic.",
+         None,
+         "makes decisions based on conditions"),
+        ('loop', r'for\s*\(|while\s*\(|do\s*\{',
+         "This code uses loops for repetition.",
+         None,
+         "repeats operations multiple times"),
+    ],
+    'java': [
+        ('package', r'package\s+[\w.]+;',
+         None,
+         "This Java code belongs to a package.",
+         None),
+        # The simplified analyzer describes imports first
+        ('simple_import', r'import\s+[\w.]+;',
+         None,
+         "This code imports Java libraries or classes.",
+         "uses external Java libraries"),
+        # The full analyzer describes classes and methods from their captured names
+        ('class', r'class\s+\w+',
+         None,
+         "This code defines Java classes.",
+         None),
+        ('main', r'public\s+static\s+void\s+main',
+         "This contains a main method that serves as the program's entry point.",
+         "This code contains a main method (entry point).",
+         "serves as a program starting point"),
+        ('method', r'public\s+\w+\s+\w+\s*\(|private\s+\w+\s+\w+\s*\(',
+         None,
+         "This code defines methods.",
+         None),
+        ('output', ('System.out.print',),
+         "This displays output to the console.",
+         None,
+         "displays output to users"),
+        ('import', r'import\s+[\w.]+;',
+         "This imports external Java libraries or classes.",
+         None,
+         "uses external Java libraries"),
+        # The simplified analyzer's narrower conditional and loop patterns
+        ('simple_conditional', r'if\s*\(|switch\s*\(',
+         None,
+         "This code contains conditional logic.",
+         "makes decisions based on conditions"),
+        ('simple_loop', r'for\s*\(|while\s*\(',
+         None,
+         "This code contains loops.",
+         "repeats operations multiple times"),
+        ('conditional', r'if\s*\(|else|switch',
+         "This contains conditional logic for decision making.",
+         None,
+         "makes decisions based on conditions"),
+        ('loop', r'for\s*\(|while\s*\(|do\s*\{',
+         "This uses loops to repeat operations.",
+         None,
+         "repeats operations multiple times"),
+    ],
+    'javascript': [
+        # The full analyzer describes functions, classes and variables from their captured names
+        ('function', r'function\s+\w+|const\s+\w+\s*=[^\n;]*=>',
+         None,
+         "This JavaScript code contains function definitions.",
+         None),
+        ('class', r'class\s+\w+',
+         None,
+         "This code defines classes.",
+         None),
+        ('import', r'import\s+.*from|require\s*\(',
+         None,
+         "This code imports modules or dependencies.",
+         None),
+        ('variable', r'let\s+|const\s+|var\s+',
+         None,
+         "This code declares variables.",
+         None),
+        ('output', ('console.log', 'alert', 'document.write'),
+         "This displays output or information to the user.",
+         None,
+         "displays output or information to the user"),
+        ('event', ('addEventListener', 'onclick', 'onload'),
+         "This handles user interactions and events.",
+         None,
+         "responds to user interactions"),
+        ('dom', ('document.', 'getElementById', 'querySelector'),
+         "This manipulates HTML elements on the page.",
+         None,
+         "modifies web page content"),
+        ('network', ('fetch(', 'axios', 'XMLHttpRequest'),
+         "This makes network requests to external services.",
+         None,
+         "communicates with external services"),
+        # The simplified analyzer's narrower conditional pattern
+        ('simple_conditional', r'if\s*\(|switch\s*\(',
+         None,
+         "This code contains conditional logic.",
+         "makes decisions based on conditions"),
+        ('conditional', r'if\s*\(|else|switch',
+         "This contains conditional logic for decision making.",
+         None,
+         "makes decisions based on conditions"),
+        ('loop', r'for\s*\(|while\s*\(|forEach',
+         "This uses loops to repeat operations.",
+         "This code contains loops or iterations.",
+         "repeats operations multiple times"),
+        ('async', ('async', 'await', '.then(', 'Promise'),
+         "This handles asynchronous operations.",
+         None,
+         "performs operations that take time to complete"),
+    ],
+}
+
+
+def compile_pattern(pattern):
+    """
+    Compile a capture pattern with RE2 when available, otherwise with ``re``.
+    """
+    if HAS_RE2:
+        return re2.compile(pattern)
+    return re.compile(pattern, re.ASCII)
+
+
+class FeatureSet:
+    """
+    A fixed list of named feature patterns matched against code.
+    """
+    
+    def __init__(self, features):
+        """
+        Compile the feature patterns.
+        
+        Args:
+            features: List of (name, pattern) tuples. The pattern is either a
+                      regex string or a tuple of literal strings, any of which
+                      marks the feature as present.
+        """
+        self._literals = [(name, pattern) for name, pattern in features if isinstance(pattern, tuple)]
+        patterns = [(name, pattern) for name, pattern in features if not isinstance(pattern, tuple)]
+        self.names = [name for name, _ in patterns]
+        self._set = None
+        self._patterns = []
+        
+        if not patterns:
+            return
+            
+        if HAS_RE2:
+            self._set = re2.Set.SearchSet()
+            for _, pattern in patterns:
+                self._set.Add(pattern)
+            self._set.Compile()
+        else:
+            self._patterns = [(name, re.compile(pattern, re.ASCII)) for name, pattern in patterns]
+            
+    def scan(self, code):
+        """
+        Return the set of feature names whose pattern occurs in the code.
+        """
+        seen = {name for name, literals in self._literals if any(literal in code for literal in literals)}
+        if self._set is not None:
+            # RE2::Set returns None rather than an empty list when nothing matches
+            seen.update(self.names[index] for index in self._set.Match(code) or ())
+        else:
+            # Each search stops at the feature's first occurrence
+            seen.update(name for name, pattern in self._patterns if pattern.search(code))
+        return seen
+
+
+_FEATURE_SETS = {
+    lang: FeatureSet([(name, pattern) for name, pattern, *_ in entries])
+    for lang, entries in LANG_PATTERNS.items()
+}
+
+
+def explain_features(code, lang, simple=False):
+    """
+    Describe the features from a language's pattern table found in the code.
+    
+    Args:
+        code: The source code to scan.
+        lang: Key into LANG_PATTERNS ('cpp', 'java' or 'javascript').
+        simple: If True, use the short phrasing of the simplified analyzers.
+        
+    Returns:
+        Tuple of (explanation sentences, user-friendly feature phrases).
+    """
+    explanation_parts = []
+    features_found = []
+    seen = _FEATURE_SETS[lang].scan(code)
+    
+    for name, _, verbose_phrase, simple_phrase, feature_text in LANG_PATTERNS[lang]:
+        if name not in seen:
+            continue
+        phrase = simple_phrase if simple else verbose_phrase
+        if phrase:
+            explanation_parts.append(phrase)
+            if feature_text:
+                features_found.append(feature_text)
+                
+    return explanation_parts, features_found
+
+
+def split_summary(parts, limit=200):
+    """
+    Split explanation sentences into a summary and the remaining details.
+    
+    Whole sentences go into the summary until it reaches ``limit`` characters,
+    so neither half is sliced out of the joined text.
+    
+    Returns:
+        Tuple of (summary, details) strings.
+    """
+    summary_parts = []
+    details_parts = []
+    running = 0
+    for part in parts:
+        if running < limit:
+            summary_parts.append(part)
+            running += len(part) + 1
+        else:
+            details_parts.append(part)
+    return " ".join(summary_parts), " ".join(details_parts)
+
+
+def join_phrases(phrases):
+    """
+    Join phrases into an English list: "a", "a and b" or "a, b, and c".
+    """
+    if len(phrases) <= 2:
+        return ' and '.join(phrases)
+    return f"{', '.join(phrases[:-1])}, and {phrases[-1]}"
@@ -0,0 +1,74 @@
+"""
+In-process result caching for code explanations.
+
+Users often re-submit the same code while editing it in the web UI. The
+analyzers cache results keyed by a digest of the submitted source, so an
+identical request skips parsing and analysis entirely.
+"""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class ResultCache:
+    """
+    A bounded LRU cache of analysis results keyed by a digest of the source code.
+    
+    Only the 16-byte digest is kept for each entry, not the source itself, so
+    large submissions do not pin memory. Results are deep-copied on the way in
+    and out because callers are free to modify the dicts they get back.
+    """
+    
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        
+    @staticmethod
+    def key(code: str, *extra) -> tuple:
+        """
+        Build a cache key from the source code and any other inputs that affect the result.
+        """
+        digest = hashlib.blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        return (digest,) + extra
+        
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of the cached result for the key, or None on a miss.
+        """
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(result)
+        
+    def put(self, key: tuple, result: Dict[str, Any]) -> None:
+        """
+        Store a copy of the result, evicting the least recently used entry when full.
+        """
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the current size and hit/miss counts.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -1,5 +1,6 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, stream_with_context
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
 import sys
 import os
 
@@ -7,27 +8,61 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import rule-based analyzers
-from app.analyzers.python_analyzer import analyze_python
+from app.analyzers.python_analyzer import analyze_python, result_cache as python_result_cache
+from app.analyzers.python_incremental import edit_session, start_session
 from app.analyzers.js_analyzer import analyze_javascript
-from app.analyzers.java_analyzer import analyze_java
+from app.analyzers.java_analyzer import analyze_java, result_cache as java_result_cache
 from app.analyzers.cpp_analyzer import analyze_cpp
 
+from app.serialization import dumps
+
 # Import NLP-based analyzer
-from app.nlp.api import analyze_code_nlp, format_explanation
+from app.nlp.api import GEMINI_ALIASES, analyze_code_nlp, format_explanation, result_cache as nlp_result_cache
+from app.nlp.gemini_analyzer import result_cache as gemini_result_cache, stream_code_with_gemini
 
 app = Flask(__name__)
 CORS(app)
 
+# Reject request bodies over 1 MB with a 413 before they are read, and
+# submissions over MAX_CODE_LENGTH characters before they are analyzed
+app.config['MAX_CONTENT_LENGTH'] = 1_000_000
+MAX_CODE_LENGTH = 200_000
+
+# Rule-based analyzers by language
+RULE_ANALYZERS = {
+    "python": analyze_python,
+    "javascript": analyze_javascript,
+    "java": analyze_java,
+    "c++": analyze_cpp
+}
+SUPPORTED_LANGUAGES = ", ".join(RULE_ANALYZERS)
+
+# Shared pool for analyzing the files of a batch request concurrently. The
+# analyzers only share their compiled patterns, which are read-only.
+batch_executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+def _json(payload, status=200):
+    """Serialize a payload into a JSON response."""
+    return app.response_class(dumps(payload), status=status, mimetype='application/json')
+
 @app.route('/')
 def read_root():
-    return jsonify({"message": "Welcome to Explain My Code API"})
+    return _json({"message": "Welcome to Explain My Code API"})
 
 @app.route('/explain/', methods=['POST'])
 def explain_code():
-    data = request.json
+    data = request.get_json(silent=True, cache=True)
     
-    if not data or 'code' not in data or 'language' not in data:
-        return jsonify({"error": "Request must include code and language"}), 400
+    if not data or not isinstance(data, dict):
+        return _json({"error": "Invalid or missing JSON"}, 400)
+    if 'code' not in data or 'language' not in data:
+        return _json({"error": "Request must include code and language"}, 400)
+    if not isinstance(data['code'], str) or not isinstance(data['language'], str):
+        return _json({"error": "Code and language must be strings"}, 400)
+    if not isinstance(data.get('analysis_method', 'rule'), str):
+        return _json({"error": "analysis_method must be a string"}, 400)
+    if not isinstance(data.get('model_name') or '', str):
+        return _json({"error": "model_name must be a string"}, 400)
     
     code = data['code']
     language = data['language'].lower()
@@ -37,7 +72,9 @@ def explain_code():
     model_name = data.get('model_name')
     
     if not code:
-        return jsonify({"error": "Code cannot be empty"}), 400
+        return _json({"error": "Code cannot be empty"}, 400)
+    if len(code) > MAX_CODE_LENGTH:
+        return _json({"error": f"Code cannot be longer than {MAX_CODE_LENGTH} characters"}, 413)
     
     try:
         if analysis_method == 'nlp':
@@ -45,30 +82,23 @@ def explain_code():
             explanation_result = analyze_code_nlp(code, language, model_name)
             
             # Check if this is a Gemini response (which is already properly formatted)
-            if (model_name and model_name.lower() in ['gemini', 'gemini-1.5-flash', 'gemini-flash', 'google-gemini']) or \
+            if (model_name and model_name.lower() in GEMINI_ALIASES) or \
                (explanation_result.get('metadata', {}).get('provider') == 'google'):
                 # Gemini responses are already properly formatted
-                return jsonify(explanation_result)
+                return _json(explanation_result)
             else:
                 # Traditional NLP models need formatting
                 formatted_explanation = format_explanation(explanation_result)
-                return jsonify(formatted_explanation)
+                return _json(formatted_explanation)
         else:
             # Use rule-based analysis
-            explanation_result = None
+            analyzer = RULE_ANALYZERS.get(language)
+            if analyzer is None:
+                return _json({
+                    "error": f"Language {language} is not supported. Supported languages: {SUPPORTED_LANGUAGES}"
+                }, 400)
             
-            if language == "python":
-                explanation_result = analyze_python(code)
-            elif language == "javascript":
-                explanation_result = analyze_javascript(code)
-            elif language == "java":
-                explanation_result = analyze_java(code)
-            elif language == "c++":
-                explanation_result = analyze_cpp(code)
-            else:
-                return jsonify({
-                    "error": f"Language {language} is not supported. Supported languages: python, javascript, java, c++"
-                }), 400
+            explanation_result = analyzer(code)
             
             # Format rule-based analysis to match NLP format
             if isinstance(explanation_result, str):
@@ -92,10 +122,132 @@ def explain_code():
                 # New structured format
                 formatted_result = explanation_result
                 
-            return jsonify(formatted_result)
+            return _json(formatted_result)
+    
+    except Exception as e:
+        return _json({"error": f"Error analyzing code: {str(e)}"}, 500)
+
+@app.route('/explain/stream/', methods=['POST'])
+def explain_stream():
+    """
+    Stream a Gemini explanation as server-sent events while it is generated.
     
+    Each text chunk is sent as a data event with a "text" field. A final
+    "done" event carries the structured explanation.
+    """
+    data = request.get_json(silent=True, cache=True)
+    
+    if not data or not isinstance(data, dict):
+        return _json({"error": "Invalid or missing JSON"}, 400)
+    if 'code' not in data or 'language' not in data:
+        return _json({"error": "Request must include code and language"}, 400)
+    if not isinstance(data['code'], str) or not isinstance(data['language'], str):
+        return _json({"error": "Code and language must be strings"}, 400)
+    
+    code = data['code']
+    language = data['language'].lower()
+    
+    if not code:
+        return _json({"error": "Code cannot be empty"}, 400)
+    if len(code) > MAX_CODE_LENGTH:
+        return _json({"error": f"Code cannot be longer than {MAX_CODE_LENGTH} characters"}, 413)
+    
+    try:
+        stream = stream_code_with_gemini(code, language)
     except Exception as e:
-        return jsonify({"error": f"Error analyzing code: {str(e)}"}), 500
+        return _json({"error": f"Error analyzing code: {str(e)}"}, 500)
+    
+    def events():
+        try:
+            while True:
+                yield b"data: " + dumps({"text": next(stream)}) + b"\n\n"
+        except StopIteration as done:
+            yield b"event: done\ndata: " + dumps(done.value) + b"\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream')
+
+@app.route('/explain/batch/', methods=['POST'])
+def explain_batch():
+    """Explain several files at once using rule-based analysis."""
+    data = request.get_json(silent=True, cache=True)
+    files = data.get('files') if isinstance(data, dict) else None
+    
+    if not isinstance(files, list) or not files:
+        return _json({"error": "Request must include a list of files"}, 400)
+    
+    for file in files:
+        if not isinstance(file, dict) or not file.get('code') or 'language' not in file:
+            return _json({"error": "Each file must include code and language"}, 400)
+        if not isinstance(file['code'], str) or not isinstance(file['language'], str):
+            return _json({"error": "Code and language must be strings"}, 400)
+        if len(file['code']) > MAX_CODE_LENGTH:
+            return _json({"error": f"Code cannot be longer than {MAX_CODE_LENGTH} characters"}, 413)
+        if file['language'].lower() not in RULE_ANALYZERS:
+            return _json({
+                "error": f"Language {file['language']} is not supported. Supported languages: {SUPPORTED_LANGUAGES}"
+            }, 400)
+    
+    try:
+        results = list(batch_executor.map(
+            lambda file: RULE_ANALYZERS[file['language'].lower()](file['code']),
+            files
+        ))
+        return _json({"results": results})
+    
+    except Exception as e:
+        return _json({"error": f"Error analyzing code: {str(e)}"}, 500)
+
+@app.route('/explain/incremental/', methods=['POST'])
+def explain_incremental():
+    """
+    Explain Python code that is being edited.
+    
+    The first request of a session sends the full code; later requests send
+    only the edits made since, as a list of {start, end, text} replacements.
+    Sessions are kept per worker process, so with several workers a session's
+    requests must be routed to the worker that started it; otherwise edits get
+    a 404 and the client resends the full code.
+    """
+    data = request.get_json(silent=True, cache=True)
+    
+    if not isinstance(data, dict) or not isinstance(data.get('session_id'), str):
+        return _json({"error": "Request must include a session_id"}, 400)
+    
+    session_id = data['session_id']
+    
+    try:
+        if 'code' in data:
+            code = data['code']
+            if not isinstance(code, str):
+                return _json({"error": "Code must be a string"}, 400)
+            if len(code) > MAX_CODE_LENGTH:
+                return _json({"error": f"Code cannot be longer than {MAX_CODE_LENGTH} characters"}, 413)
+            return _json(start_session(session_id, code))
+        
+        if not isinstance(data.get('edits'), list):
+            return _json({"error": "Request must include code or a list of edits"}, 400)
+        
+        result = edit_session(session_id, data['edits'], MAX_CODE_LENGTH)
+        if result is None:
+            return _json({"error": "Unknown session; send the full code to start it"}, 404)
+        return _json(result)
+    
+    except ValueError as e:
+        return _json({"error": str(e)}, 400)
+    except Exception as e:
+        return _json({"error": f"Error analyzing code: {str(e)}"}, 500)
+
+@app.route('/stats/', methods=['GET'])
+def get_stats():
+    """Return hit/miss counts for the result caches."""
+    return _json({
+        "cache": {
+            "python": python_result_cache.stats(),
+            "java": java_result_cache.stats(),
+            "nlp": nlp_result_cache.stats(),
+            "gemini": gemini_result_cache.stats()
+        }
+    })
 
 @app.route('/analyze_methods/', methods=['GET'])
 def get_analyze_methods():
@@ -132,7 +284,7 @@ def get_analyze_methods():
             # Add more models as they become available
         ]
     }
-    return jsonify(methods)
+    return _json(methods)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8000, debug=True) 
\ No newline at end of file
@@ -6,9 +6,49 @@ interface with the Flask API.
 """
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+from ..cache import ResultCache
 from .model import ModelManager
-from .gemini_analyzer import analyze_code_with_gemini
+from .gemini_analyzer import analyze_code_batch_with_gemini, analyze_code_with_gemini
+
+# Directory holding locally saved copies of the models
+SAVED_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_models")
+
+DEFAULT_MODEL_NAME = "Salesforce/codegen-350M-mono"
+
+# Model names that select the Gemini API instead of a local model
+GEMINI_ALIASES = frozenset({'gemini', 'gemini-1.5-flash', 'gemini-flash', 'google-gemini'})
+
+# Map language names to the standardized names the models are prompted with
+LANGUAGE_ALIASES = {
+    'python': 'python',
+    'py': 'python',
+    'javascript': 'javascript',
+    'js': 'javascript',
+    'typescript': 'javascript',
+    'ts': 'javascript',
+    'java': 'java',
+    'c++': 'cpp',
+    'cpp': 'cpp',
+}
+
+# Local model path per model name, resolved on first use
+_model_paths = {}
+
+
+def _local_model_path(model_name: str) -> str:
+    """
+    Return the saved_models path for a model, e.g. "codegen-350M-mono" for "Salesforce/codegen-350M-mono".
+    """
+    path = _model_paths.get(model_name)
+    if path is None:
+        path = _model_paths[model_name] = os.path.join(SAVED_MODELS_DIR, model_name.split("/")[-1])
+    return path
+
+
+# Recent explanations by source digest, language and model. Model inference
+# is by far the slowest path, so repeat submissions are answered from here.
+result_cache = ResultCache(maxsize=512)
 
 
 def analyze_code_nlp(code: str, language: str, model_name: str = None) -> Dict[str, Any]:
@@ -23,50 +63,93 @@ def analyze_code_nlp(code: str, language: str, model_name: str = None) -> Dict[s
     Returns:
         A dictionary containing the explanation and metadata.
     """
+    key = ResultCache.key(code, language, model_name)
+    result = result_cache.get(key)
+    if result is not None:
+        return result
+    
+    result = _analyze_code_nlp(code, language, model_name)
+    
+    if _succeeded(result):
+        result_cache.put(key, result)
+    
+    return result
+
+
+def analyze_code_nlp_batch(items: List[Tuple[str, str]], model_name: str = None) -> List[Dict[str, Any]]:
+    """
+    Analyze several (code, language) pairs using the NLP model, in input order.
+    
+    With a local model, the uncached pairs are generated together in batches
+    rather than one request at a time.
+    
+    Args:
+        items: The source code to analyze and its programming language.
+        model_name: Optional name of the model to use. If None, uses the default model.
+        
+    Returns:
+        A dictionary containing the explanation and metadata for each pair.
+    """
+    keys = [ResultCache.key(code, language, model_name) for code, language in items]
+    results = [result_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    
+    if missing:
+        for i, result in zip(missing, _analyze_code_nlp_batch([items[i] for i in missing], model_name)):
+            results[i] = result
+            if _succeeded(result):
+                result_cache.put(keys[i], result)
+    
+    return results
+
+
+def _succeeded(result: Dict[str, Any]) -> bool:
+    # Failures may be transient (network, model loading), so only cache successes
+    return "error" not in result and not result.get("metadata", {}).get("error")
+
+
+def _gemini_error(e: Exception) -> Dict[str, Any]:
+    return {
+        "error": f"Gemini analysis failed: {str(e)}",
+        "raw_explanation": "",
+        "structured_explanation": {}
+    }
+
+
+def _get_model(model_name: str = None):
+    # Get the model, defaulting to the CodeGen model which is more suitable for generation
+    model_name = model_name or DEFAULT_MODEL_NAME
+    return ModelManager.get_model(model_name, _local_model_path(model_name))
+
+
+def _standardize_language(language: str) -> str:
+    language = language.lower()
+    return LANGUAGE_ALIASES.get(language, language)
+
+
+def _analyze_code_nlp(code: str, language: str, model_name: str = None) -> Dict[str, Any]:
     # Check if Gemini model is requested
-    if model_name and model_name.lower() in ['gemini', 'gemini-1.5-flash', 'gemini-flash', 'google-gemini']:
+    if model_name and model_name.lower() in GEMINI_ALIASES:
         try:
             return analyze_code_with_gemini(code, language)
         except Exception as e:
-            return {
-                "error": f"Gemini analysis failed: {str(e)}",
-                "raw_explanation": "",
-                "structured_explanation": {}
-            }
-    
-    # Map language to standardized format
-    lang_map = {
-        'python': 'python',
-        'py': 'python',
-        'javascript': 'javascript',
-        'js': 'javascript',
-        'typescript': 'javascript',
-        'ts': 'javascript',
-        'java': 'java',
-        'c++': 'cpp',
-        'cpp': 'cpp',
-    }
-    
-    # Standardize language
-    std_language = lang_map.get(language.lower(), language.lower())
-    
-    # Get the model
-    if model_name:
-        # Compute the local model path
-        model_short_name = model_name.split("/")[-1] if "/" in model_name else model_name
-        local_model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_models", model_short_name)
-        model = ModelManager.get_model(model_name, local_model_path)
-    else:
-        # Default to Salesforce CodeGen model which is more suitable for generation
-        default_model_name = "Salesforce/codegen-350M-mono"
-        model_short_name = default_model_name.split("/")[-1]
-        local_model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_models", model_short_name)
-        model = ModelManager.get_model(default_model_name, local_model_path)
+            return _gemini_error(e)
     
     # Get the explanation
-    result = model.explain_code(code, std_language)
+    return _get_model(model_name).explain_code(code, _standardize_language(language))
+
+
+def _analyze_code_nlp_batch(items: List[Tuple[str, str]], model_name: str = None) -> List[Dict[str, Any]]:
+    if model_name and model_name.lower() in GEMINI_ALIASES:
+        try:
+            return analyze_code_batch_with_gemini(items)
+        except Exception as e:
+            return [_gemini_error(e) for _ in items]
     
-    return result
+    return _get_model(model_name).explain_code_batch(
+        [code for code, _ in items],
+        [_standardize_language(language) for _, language in items]
+    )
 
 
 def format_explanation(explanation_result: Dict[str, Any]) -> Dict[str, Any]:
@@ -3,67 +3,45 @@ Gemini-based code analyzer for high-quality explanations.
 Uses Google's Gemini API to provide Copilot-level code explanations.
 """
 
+import asyncio
+import copy
 import google.generativeai as genai
 import os
-from typing import Dict, Any
+import time
+import re
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, Generator, List, Tuple
 import logging
+from google.api_core import exceptions as api_exceptions
+from google.api_core.retry import Retry, if_exception_type
+from google.api_core.retry_async import AsyncRetry
+from ..cache import ResultCache
+from ..serialization import dumps
 
-class GeminiCodeAnalyzer:
-    """
-    High-quality code analyzer using Google's Gemini AI.
-    Provides detailed, natural language explanations similar to GitHub Copilot.
-    """
-    
-    def __init__(self, api_key: str = None):
-        """Initialize the Gemini analyzer with API key."""
-        self.api_key = GEMINI_API_KEY
-        genai.configure(api_key=self.api_key)
-        
-        # Use Gemini Flash model - lighter and more cost-effective
-        self.model = genai.GenerativeModel('models/gemini-1.5-flash')
-        
-        # Language-specific prompt templates
-        self.language_contexts = {
-            'python': {
-                'description': 'Python programming language',
-                'features': 'dynamic typing, object-oriented programming, functional programming, extensive standard library',
-                'common_patterns': 'functions, classes, decorators, list comprehensions, context managers'
-            },
-            'javascript': {
-                'description': 'JavaScript programming language',
-                'features': 'dynamic typing, event-driven programming, asynchronous programming, DOM manipulation',
-                'common_patterns': 'functions, arrow functions, promises, async/await, objects, arrays'
-            },
-            'java': {
-                'description': 'Java programming language',
-                'features': 'static typing, object-oriented programming, platform independence, strong type system',
-                'common_patterns': 'classes, interfaces, inheritance, polymorphism, exception handling'
-            },
-            'cpp': {
-                'description': 'C++ programming language',
-                'features': 'static typing, low-level control, object-oriented programming, template metaprogramming',
-                'common_patterns': 'classes, templates, pointers, memory management, RAII'
-            },
-            'c': {
-                'description': 'C programming language',
-                'features': 'static typing, procedural programming, low-level control, manual memory management',
-                'common_patterns': 'functions, structures, pointers, arrays, manual memory allocation'
-            }
-        }
-    
-    def create_expert_prompt(self, code: str, language: str) -> str:
-        """
-        Create an expert-level prompt for Gemini that produces Copilot-quality explanations.
-        """
-        lang_info = self.language_contexts.get(language.lower(), self.language_contexts['python'])
-        
-        prompt = f"""You are a senior software engineer and coding mentor with expertise in {lang_info['description']}. 
-Your task is to explain code in a clear, educational, and comprehensive manner similar to how GitHub Copilot explains code.
+logger = logging.getLogger(__name__)
 
-**Code to Analyze ({language.upper()}):**
-```{language}
-{code}
-```
+# The SDK is configured once per process rather than per analyzer
+_API_KEY = os.environ.get("GEMINI_API_KEY")
+if _API_KEY:
+    genai.configure(api_key=_API_KEY)
+
+# Use Gemini Flash model - lighter and more cost-effective
+_MODEL = genai.GenerativeModel('models/gemini-1.5-flash')
+
+# Recent explanations by language and whitespace-trimmed source. A cache hit
+# skips the Gemini round trip, which takes seconds and is billed per token.
+result_cache = ResultCache(maxsize=1024)
+
+# Expert prompt. The language context fields are filled in once per language
+# at import; code and language are filled in per request.
+# The code comes last, so every request for a language starts with the same
+# instructions and the API can reuse its cached processing of that prefix.
+_PROMPT_TEMPLATE = """You are a senior software engineer and coding mentor with expertise in {description}. 
+Your task is to explain code in a clear, educational, and comprehensive manner similar to how GitHub Copilot explains code.
 
 **Your Task:**
 Provide a detailed explanation that includes:
@@ -78,23 +56,234 @@ Provide a detailed explanation that includes:
 - Write in clear, conversational English that a developer would understand
 - Use technical terms appropriately but explain complex concepts
 - Focus on WHAT the code does, HOW it works, and WHY it's structured this way
-- Be specific about the {language} features being used: {lang_info['features']}
-- Mention relevant {language} patterns: {lang_info['common_patterns']}
+- Be specific about the {language} features being used: {features}
+- Mention relevant {language} patterns: {common_patterns}
 - Keep explanations practical and actionable
 - Use bullet points or numbered lists for clarity when needed
 
-**Example Style:**
-"This code defines a Python function that... The function works by first... Then it... This is useful because..."
-
 **Important**: 
 - Be thorough but concise
 - Focus on understanding, not just describing
 - Explain the "why" behind the code choices
 - Make it educational and insightful
 
+**Code to Analyze ({language_upper}):**
+```{language}
+{code}
+```
+
 Please provide your explanation now:"""
 
-        return prompt
+# Language context as (description, features, common patterns)
+LANGUAGE_CONTEXTS = MappingProxyType({
+    'python': (
+        'Python programming language',
+        'dynamic typing, object-oriented programming, functional programming, extensive standard library',
+        'functions, classes, decorators, list comprehensions, context managers'
+    ),
+    'javascript': (
+        'JavaScript programming language',
+        'dynamic typing, event-driven programming, asynchronous programming, DOM manipulation',
+        'functions, arrow functions, promises, async/await, objects, arrays'
+    ),
+    'java': (
+        'Java programming language',
+        'static typing, object-oriented programming, platform independence, strong type system',
+        'classes, interfaces, inheritance, polymorphism, exception handling'
+    ),
+    'cpp': (
+        'C++ programming language',
+        'static typing, low-level control, object-oriented programming, template metaprogramming',
+        'classes, templates, pointers, memory management, RAII'
+    ),
+    'c': (
+        'C programming language',
+        'static typing, procedural programming, low-level control, manual memory management',
+        'functions, structures, pointers, arrays, manual memory allocation'
+    )
+})
+
+# Prompt template per language with its context already filled in
+_LANGUAGE_PROMPTS = {
+    lang: _PROMPT_TEMPLATE.replace('{description}', description)
+                          .replace('{features}', features)
+                          .replace('{common_patterns}', common_patterns)
+    for lang, (description, features, common_patterns) in LANGUAGE_CONTEXTS.items()
+}
+
+# Start of the first markdown header, bold line or list item
+_HEADER_RE = re.compile(r'^[^\S\n]*[#*]', re.MULTILINE)
+
+# Non-empty lines that are not headers or list items, without surrounding whitespace
+_CONTENT_LINE_RE = re.compile(r'^[^\S\n]*([^#*\s](?:[^\n]*\S)?)', re.MULTILINE)
+
+def _split_explanation(explanation: str, language: str) -> Tuple[str, str, str]:
+    """
+    Split a Gemini explanation into its summary, user-friendly summary and details.
+    """
+    # Lines before the first markdown header or list item form the
+    # overview; the first three are the summary, the rest are details
+    header = _HEADER_RE.search(explanation)
+    if header:
+        overview_lines = _CONTENT_LINE_RE.findall(explanation, 0, header.start())
+        detailed_lines = overview_lines[3:] + _CONTENT_LINE_RE.findall(explanation, header.start())
+    else:
+        overview_lines = _CONTENT_LINE_RE.findall(explanation)
+        detailed_lines = overview_lines[3:]
+    summary_lines = overview_lines[:3]
+    
+    # Create summary and full explanation
+    summary = ' '.join(summary_lines[:2]) if summary_lines else explanation[:200] + "..."
+    user_friendly = f"In simple terms, this {language} code " + (summary_lines[0].lower() if summary_lines else "performs programming operations.")
+    details = ' '.join(detailed_lines) if detailed_lines else ""
+    return summary, user_friendly, details
+
+# Upper bound on prompt tokens per request. Code is truncated to fit using a
+# conservative estimate of characters per token rather than a count_tokens
+# call, which would cost a round trip of its own.
+MAX_INPUT_TOKENS = 6000
+_CHARS_PER_TOKEN = 3
+_MAX_CODE_CHARS = MAX_INPUT_TOKENS * _CHARS_PER_TOKEN - len(_PROMPT_TEMPLATE)
+
+def _truncate_code(code: str) -> Tuple[str, bool]:
+    """
+    Cut code that would exceed MAX_INPUT_TOKENS at the last line break that fits.
+    
+    Returns:
+        The code to send and whether it was truncated.
+    """
+    if len(code) <= _MAX_CODE_CHARS:
+        return code, False
+    cut = code.rfind('\n', 0, _MAX_CODE_CHARS)
+    return code[:cut if cut > 0 else _MAX_CODE_CHARS], True
+
+# Rate-limit and overload errors are retried with exponential backoff for up
+# to RETRY_TIMEOUT seconds before a request fails
+RETRY_TIMEOUT = 30.0
+_RETRYABLE_ERRORS = (api_exceptions.ResourceExhausted, api_exceptions.ServiceUnavailable)
+_RETRY = Retry(predicate=if_exception_type(*_RETRYABLE_ERRORS), initial=1.0, maximum=8.0, multiplier=2.0, timeout=RETRY_TIMEOUT)
+_ASYNC_RETRY = AsyncRetry(predicate=if_exception_type(*_RETRYABLE_ERRORS), initial=1.0, maximum=8.0, multiplier=2.0, timeout=RETRY_TIMEOUT)
+
+class CircuitBreaker:
+    """
+    Fails requests immediately while the API keeps failing, instead of
+    letting each one wait out its retries and timeout.
+    
+    After fail_max consecutive failures the breaker opens and allow() returns
+    False for reset_timeout seconds. The first request after that is let
+    through as a trial; it closes the breaker on success or reopens it on
+    failure. Used as a context manager around the API call, it records the
+    outcome, counting only exceptions of the given error types.
+    """
+    
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0, errors: tuple = (Exception,)):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.errors = errors
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+        
+    def allow(self) -> bool:
+        """Return whether a request may be made now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Let one trial request through; further ones wait for its outcome
+                self._opened_at = time.monotonic()
+                return True
+            return False
+            
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            if exc_type is None:
+                self._failures = 0
+                self._opened_at = None
+            elif issubclass(exc_type, self.errors):
+                self._failures += 1
+                if self._failures >= self.fail_max:
+                    self._opened_at = time.monotonic()
+        return False
+
+# Shared by all analyzers, since they all call the same endpoint. Retried
+# 503/429 errors surface as RetryError once RETRY_TIMEOUT runs out, so those
+# count as failures too.
+_breaker = CircuitBreaker(fail_max=5, reset_timeout=30.0,
+                          errors=(api_exceptions.ServerError, api_exceptions.ResourceExhausted,
+                                  api_exceptions.RetryError))
+
+# Gemini requests in flight by cache key. A request for code that is already
+# being explained waits for that result rather than paying for a second call.
+_inflight: Dict[tuple, Future] = {}
+_inflight_lock = threading.Lock()
+_inflight_async: Dict[tuple, "asyncio.Future"] = {}
+
+# Most Gemini requests made at once by analyze_code_batch
+BATCH_CONCURRENCY = 8
+
+@dataclass
+class AnalysisResult:
+    """
+    A structured Gemini explanation.
+    
+    Results are built as slotted objects and turned into the dicts the API
+    returns by to_dict, which keeps the same key order as before.
+    """
+    __slots__ = ("summary", "user_friendly_summary", "full_explanation", "details", "functions",
+                 "classes", "variables", "imports", "language", "metadata")
+    
+    summary: str
+    user_friendly_summary: str
+    full_explanation: str
+    details: str
+    functions: list
+    classes: list
+    variables: list
+    imports: list
+    language: str
+    metadata: dict
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the result as a dict. The lists and metadata are shared, not copied.
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class GeminiCodeAnalyzer:
+    """
+    High-quality code analyzer using Google's Gemini AI.
+    Provides detailed, natural language explanations similar to GitHub Copilot.
+    """
+    
+    def __init__(self, api_key: str = None):
+        """
+        Initialize the Gemini analyzer.
+        
+        Args:
+            api_key: Optional API key. If None, the GEMINI_API_KEY environment
+                variable, read once at import, is used.
+        """
+        if api_key:
+            genai.configure(api_key=api_key)
+        elif not _API_KEY:
+            raise ValueError("GEMINI_API_KEY is not set")
+        
+        self.model = _MODEL
+        
+        # Cap the output length, which bounds generation time and cost, and
+        # keep sampling close to deterministic for consistent explanations
+        self._generation_config = genai.GenerationConfig(max_output_tokens=768, temperature=0.2, top_p=0.9)
+    
+    def create_expert_prompt(self, code: str, language: str) -> str:
+        """
+        Create an expert-level prompt for Gemini that produces Copilot-quality explanations.
+        """
+        template = _LANGUAGE_PROMPTS.get(language.lower(), _LANGUAGE_PROMPTS['python'])
+        return template.format(code=code, language=language, language_upper=language.upper())
     
     def analyze_code(self, code: str, language: str) -> Dict[str, Any]:
         """
@@ -107,108 +296,237 @@ Please provide your explanation now:"""
         Returns:
             Dictionary containing the analysis results
         """
+        key = ResultCache.key(code.strip(), language)
+        result = result_cache.get(key)
+        if result is not None:
+            return result
+        
+        # Join an identical request that is already waiting on Gemini
+        with _inflight_lock:
+            flight = _inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _inflight[key] = Future()
+        if not leader:
+            return copy.deepcopy(flight.result())
+        
+        try:
+            result = self._request(code, language, key)
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            with _inflight_lock:
+                del _inflight[key]
+    
+    def _request(self, code: str, language: str, key: tuple) -> Dict[str, Any]:
+        """Send one analysis request to Gemini and structure the response."""
         try:
-            print(f"[DEBUG] Gemini: Analyzing {language} code...")
-            print(f"[DEBUG] Code length: {len(code)} characters")
-            
             # Create the expert prompt
+            code, truncated = _truncate_code(code)
             prompt = self.create_expert_prompt(code, language)
-            print(f"[DEBUG] Prompt created, length: {len(prompt)} characters")
+            logger.debug("Analyzing %s code: %d characters, prompt %d characters", language, len(code), len(prompt))
             
             # Generate response using Gemini
-            print("[DEBUG] Calling Gemini API...")
-            response = self.model.generate_content(prompt)
-            print(f"[DEBUG] Gemini response received: {bool(response)}")
-            
-            if not response:
-                print("[DEBUG] No response from Gemini")
-                return self._create_error_response("Gemini did not generate a response")
+            if not _breaker.allow():
+                return self._create_error_response("Gemini is temporarily unavailable").to_dict()
+            with _breaker:
+                response = self.model.generate_content(prompt, generation_config=self._generation_config,
+                                                       request_options={"retry": _RETRY})
+            return self._handle_response(response, language, key, truncated)
             
-            if not response.text:
-                print("[DEBUG] Response has no text")
-                return self._create_error_response("Gemini response is empty")
-            
-            explanation = response.text.strip()
-            print(f"[DEBUG] Explanation length: {len(explanation)} characters")
-            print(f"[DEBUG] Explanation preview: {explanation[:100]}...")
-            
-            # Structure the response
-            result = self._structure_gemini_response(explanation, language)
-            print(f"[DEBUG] Structured response created with keys: {list(result.keys())}")
+        except Exception as e:
+            logger.error("Gemini analysis error: %s", e)
+            return self._create_error_response(f"Error during Gemini analysis: {str(e)}").to_dict()
+    
+    def analyze_code_json(self, code: str, language: str) -> bytes:
+        """
+        Analyze code like analyze_code and return the result encoded as JSON.
+        """
+        return dumps(self.analyze_code(code, language))
+    
+    async def analyze_code_async(self, code: str, language: str) -> Dict[str, Any]:
+        """
+        Analyze code like analyze_code, without blocking the event loop.
+        
+        The request is made with the SDK's async client, so an asyncio server
+        can serve other requests while it waits for Gemini.
+        """
+        key = ResultCache.key(code.strip(), language)
+        result = result_cache.get(key)
+        if result is not None:
+            return result
+        
+        # Identical requests share one task. It is shielded so that a caller
+        # that is cancelled does not cancel the request for the others.
+        flight_key = (asyncio.get_running_loop(), key)
+        flight = _inflight_async.get(flight_key)
+        if flight is None:
+            flight = _inflight_async[flight_key] = asyncio.ensure_future(self._request_async(code, language, key))
+            flight.add_done_callback(lambda _: _inflight_async.pop(flight_key, None))
+        return copy.deepcopy(await asyncio.shield(flight))
+    
+    async def _request_async(self, code: str, language: str, key: tuple) -> Dict[str, Any]:
+        """Send one analysis request to Gemini with the async client."""
+        try:
+            code, truncated = _truncate_code(code)
+            prompt = self.create_expert_prompt(code, language)
+            if not _breaker.allow():
+                return self._create_error_response("Gemini is temporarily unavailable").to_dict()
+            with _breaker:
+                response = await self.model.generate_content_async(prompt, generation_config=self._generation_config,
+                                                                   request_options={"retry": _ASYNC_RETRY})
+            return self._handle_response(response, language, key, truncated)
             
+        except Exception as e:
+            logger.error("Gemini analysis error: %s", e)
+            return self._create_error_response(f"Error during Gemini analysis: {str(e)}").to_dict()
+    
+    def analyze_code_stream(self, code: str, language: str) -> Generator[str, None, Dict[str, Any]]:
+        """
+        Analyze code using Gemini, yielding the explanation text as it is generated.
+        
+        The structured result, the same dict analyze_code returns, is the
+        generator's return value and is cached once the stream completes. A
+        cached result is yielded as a single chunk.
+        """
+        key = ResultCache.key(code.strip(), language)
+        result = result_cache.get(key)
+        if result is not None:
+            yield result["full_explanation"]
             return result
+        
+        try:
+            code, truncated = _truncate_code(code)
+            prompt = self.create_expert_prompt(code, language)
+            chunks = []
+            if not _breaker.allow():
+                return self._create_error_response("Gemini is temporarily unavailable").to_dict()
+            with _breaker:
+                response = self.model.generate_content(prompt, generation_config=self._generation_config, stream=True,
+                                                       request_options={"retry": _RETRY})
+                for chunk in response:
+                    text = chunk.text
+                    chunks.append(text)
+                    yield text
+            return self._handle_text(''.join(chunks), language, key, truncated)
             
         except Exception as e:
-            print(f"[DEBUG] Gemini analysis error: {str(e)}")
-            logging.error(f"Gemini analysis error: {str(e)}")
-            return self._create_error_response(f"Error during Gemini analysis: {str(e)}")
+            logger.error("Gemini analysis error: %s", e)
+            return self._create_error_response(f"Error during Gemini analysis: {str(e)}").to_dict()
+    
+    async def analyze_code_batch_async(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Analyze several (code, language) pairs with concurrent Gemini requests.
+        
+        Identical pairs are sent once. Results are returned in input order.
+        """
+        unique = list(dict.fromkeys((code.strip(), language) for code, language in items))
+        results = await asyncio.gather(*(self.analyze_code_async(code, language) for code, language in unique))
+        by_item = dict(zip(unique, results))
+        return [copy.deepcopy(by_item[code.strip(), language]) for code, language in items]
+    
+    def analyze_code_batch(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Analyze several (code, language) pairs, waiting for all of them.
+        
+        The requests run concurrently on a thread pool with the sync client.
+        The async client is tied to the event loop it was first used on, so
+        the shared analyzer cannot start a new loop per batch.
+        """
+        unique = list(dict.fromkeys((code.strip(), language) for code, language in items))
+        with ThreadPoolExecutor(max_workers=min(len(unique), BATCH_CONCURRENCY) or 1) as executor:
+            results = executor.map(lambda item: self.analyze_code(*item), unique)
+            by_item = dict(zip(unique, results))
+        return [copy.deepcopy(by_item[code.strip(), language]) for code, language in items]
+    
+    def _handle_response(self, response, language: str, key: tuple, truncated: bool = False) -> Dict[str, Any]:
+        """Structure a Gemini response and cache it if it has an explanation."""
+        if not response:
+            logger.warning("No response from Gemini")
+            return self._create_error_response("Gemini did not generate a response").to_dict()
+        
+        return self._handle_text(response.text, language, key, truncated)
+    
+    def _handle_text(self, text: str, language: str, key: tuple, truncated: bool = False) -> Dict[str, Any]:
+        """Structure the text of a Gemini explanation and cache the result."""
+        if not text:
+            logger.warning("Gemini response has no text")
+            return self._create_error_response("Gemini response is empty").to_dict()
+        
+        explanation = text.strip()
+        logger.info("Gemini explained %s code in %d characters", language, len(explanation))
+        
+        # Structure the response
+        result = self._structure_gemini_response(explanation, language)
+        if truncated:
+            result.metadata["truncated"] = True
+        result = result.to_dict()
+        
+        # Errors are not cached, so a failed call is retried next time
+        result_cache.put(key, result)
+        return result
     
-    def _structure_gemini_response(self, explanation: str, language: str) -> Dict[str, Any]:
+    def _structure_gemini_response(self, explanation: str, language: str) -> AnalysisResult:
         """Structure the Gemini response into the expected format."""
         
-        # Extract different parts of the explanation
-        lines = explanation.split('\n')
-        
-        # Try to find overview/summary (usually in the first few lines)
-        summary_lines = []
-        detailed_lines = []
-        
-        in_detailed_section = False
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Skip markdown headers and formatting
-            if line.startswith('#') or line.startswith('**') or line.startswith('*'):
-                in_detailed_section = True
-                continue
-                
-            if not in_detailed_section and len(summary_lines) < 3:
-                summary_lines.append(line)
-            else:
-                detailed_lines.append(line)
-        
-        # Create summary and full explanation
-        summary = ' '.join(summary_lines[:2]) if summary_lines else explanation[:200] + "..."
-        user_friendly = f"In simple terms, this {language} code " + (summary_lines[0].lower() if summary_lines else "performs programming operations.")
-        
-        return {
-            "summary": summary,
-            "user_friendly_summary": user_friendly,
-            "full_explanation": explanation,
-            "details": ' '.join(detailed_lines) if detailed_lines else "",
-            "functions": [],  # Gemini doesn't extract structured data
-            "classes": [],
-            "variables": [],
-            "imports": [],
-            "language": language,
-            "metadata": {
+        summary, user_friendly, details = _split_explanation(explanation, sys.intern(language))
+        
+        return AnalysisResult(
+            summary=summary,
+            user_friendly_summary=user_friendly,
+            full_explanation=explanation,
+            details=details,
+            functions=[],  # Gemini doesn't extract structured data
+            classes=[],
+            variables=[],
+            imports=[],
+            language=language,
+            metadata={
                 "model_used": "gemini-1.5-flash",
                 "analysis_type": "nlp",
                 "provider": "google"
             }
-        }
+        )
     
-    def _create_error_response(self, error_message: str) -> Dict[str, Any]:
+    def _create_error_response(self, error_message: str) -> AnalysisResult:
         """Create a standardized error response."""
-        return {
-            "summary": f"Error: {error_message}",
-            "user_friendly_summary": "Sorry, there was an error analyzing your code.",
-            "full_explanation": f"Analysis failed: {error_message}",
-            "details": "",
-            "functions": [],
-            "classes": [],
-            "variables": [],
-            "imports": [],
-            "language": "unknown",
-            "metadata": {
+        return AnalysisResult(
+            summary=f"Error: {error_message}",
+            user_friendly_summary="Sorry, there was an error analyzing your code.",
+            full_explanation=f"Analysis failed: {error_message}",
+            details="",
+            functions=[],
+            classes=[],
+            variables=[],
+            imports=[],
+            language="unknown",
+            metadata={
                 "model_used": "gemini-1.5-flash",
                 "analysis_type": "nlp",
                 "provider": "google",
                 "error": True
             }
-        }
+        )
+
+# Shared analyzer, created on first use. Reusing it keeps one model client,
+# and with it one open connection to the Gemini API, across requests.
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+def get_analyzer() -> GeminiCodeAnalyzer:
+    """
+    Return the shared GeminiCodeAnalyzer, creating it on first use.
+    """
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = GeminiCodeAnalyzer()
+    return _analyzer
 
 # Main function for integration with existing system
 def analyze_code_with_gemini(code: str, language: str) -> Dict[str, Any]:
@@ -216,21 +534,26 @@ def analyze_code_with_gemini(code: str, language: str) -> Dict[str, Any]:
     Main function to analyze code using Gemini.
     This is the entry point that integrates with the existing NLP system.
     """
-    analyzer = GeminiCodeAnalyzer()
+    analyzer = get_analyzer()
     return analyzer.analyze_code(code, language)
 
-# Test function
-if __name__ == "__main__":
-    # Test the Gemini analyzer
-    test_code = """
-def calculate_fibonacci(n):
-    if n <= 1:
-        return n
-    return calculate_fibonacci(n-1) + calculate_fibonacci(n-2)
+async def analyze_code_with_gemini_async(code: str, language: str) -> Dict[str, Any]:
+    """
+    Async variant of analyze_code_with_gemini for use from an event loop.
+    """
+    analyzer = get_analyzer()
+    return await analyzer.analyze_code_async(code, language)
 
-print(calculate_fibonacci(10))
-"""
-    
-    result = analyze_code_with_gemini(test_code, "python")
-    print("Summary:", result["summary"])
-    print("\nFull Explanation:", result["full_explanation"])
+def stream_code_with_gemini(code: str, language: str) -> Generator[str, None, Dict[str, Any]]:
+    """
+    Stream a Gemini explanation; see GeminiCodeAnalyzer.analyze_code_stream.
+    """
+    analyzer = get_analyzer()
+    return analyzer.analyze_code_stream(code, language)
+
+def analyze_code_batch_with_gemini(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Analyze a list of (code, language) pairs using Gemini, in input order.
+    """
+    analyzer = get_analyzer()
+    return analyzer.analyze_code_batch(items)
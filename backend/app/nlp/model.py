@@ -6,10 +6,193 @@ to analyze and explain code across different programming languages.
 """
 
 import os
+import queue
+import re
+import threading
+import time
 import torch
 import traceback
 from transformers import AutoTokenizer, AutoModelForCausalLM
-from typing import Dict, Any, Optional, Tuple
+from ..cache import ResultCache
+from concurrent.futures import Future
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+# Accelerate lets from_pretrained place weights straight on the target device
+# instead of building the model in host memory first
+try:
+    import accelerate  # noqa: F401
+    HAS_ACCELERATE = True
+except ImportError:
+    HAS_ACCELERATE = False
+
+# torchao provides weight-only quantization for GPU inference
+try:
+    from torchao.quantization import quantize_, int4_weight_only, int8_weight_only
+    HAS_TORCHAO = True
+except ImportError:
+    HAS_TORCHAO = False
+
+# ONNX Runtime runs the int8 ONNX export made by setup.py on CPU
+try:
+    from optimum.onnxruntime import ORTModelForCausalLM
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    HAS_ONNXRUNTIME = False
+
+# Where setup.py saves the quantized ONNX export, inside a saved model directory
+ONNX_DIR = "onnx"
+ONNX_FILE_NAME = "model_quantized.onnx"
+
+# Weight quantization modes accepted by CodeExplanationModel
+QUANTIZATION_MODES = ("int4", "int8")
+
+# Quantization used by ModelManager, e.g. "int4"; unset loads full weights
+DEFAULT_QUANTIZATION = os.environ.get("MODEL_QUANTIZATION") or None
+
+
+def _model_dtype(device: torch.device) -> torch.dtype:
+    """
+    Return the dtype to load model weights in on the given device.
+    
+    Decoding is bound by memory bandwidth, so GPUs use 16-bit weights: BF16
+    where supported for its wider range, FP16 otherwise. CPUs stay in FP32,
+    since most lack native BF16 matrix math and would emulate it.
+    """
+    if device.type == "cuda":
+        return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    return torch.float32
+
+
+# Prompt templates. The shared instruction follows the code, so the model
+# attends to it last; its keys and values depend on the code before it and
+# cannot be computed once and reused across requests.
+CODEBERT_PROMPT = """Explain what this code does: {code}...
+Answer:"""
+CODEGEN_PROMPT = """{language} code:
+{code}
+
+What does this code do?
+This code"""
+
+# Artifacts removed from generated explanations by _clean_explanation,
+# compiled once rather than looked up in re's cache on every request
+_ARTIFACT_PATTERNS = (
+    (re.compile(r'will be executed when.*?shell'), 'performs operations'),
+    (re.compile(r'you type.*?command'), 'when executed'),
+    (re.compile(r'print on screen.*?happen'), 'displays output'),
+)
+_BECAUSE_RE = re.compile(r'because we are using.*?purpose')
+_SHOULD_USE_RE = re.compile(r'We should use.*?statement')
+_TRAILING_FRAGMENT_PATTERNS = (
+    re.compile(r'\binstead so as to avoid.*'),
+    re.compile(r'\bExample.*$'),
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Common programming patterns and their user-friendly descriptions, in the
+# order they are listed in a summary. The keywords are plain substrings, so
+# each is found with a C-speed substring search rather than a regex.
+_SUMMARY_PATTERNS = (
+    ('function', 'defines functions that can be called to perform specific tasks'),
+    ('class', 'creates classes which are blueprints for objects'),
+    ('variable', 'stores data in variables for later use'),
+    ('loop', 'repeats certain operations multiple times'),
+    ('condition', 'makes decisions based on certain conditions'),
+    ('import', 'brings in external libraries or modules'),
+    ('print', 'displays output or information to the user'),
+    ('input', 'gets information from the user'),
+    ('calculate', 'performs mathematical calculations'),
+    ('process', 'processes or manipulates data'),
+    ('file', 'works with files (reading, writing, or managing)'),
+    ('database', 'interacts with databases to store or retrieve information'),
+    ('api', 'communicates with external services or APIs'),
+    ('web', 'creates web applications or handles web requests'),
+)
+
+# Prompt lengths, in tokens, that compiled models pad their inputs up to.
+# Longer prompts are padded to the model's max_input_length.
+INPUT_LENGTH_BUCKETS = (64, 128, 256)
+
+# Tokens of a CodeGen prompt left for the template around the code
+PROMPT_RESERVED_TOKENS = 32
+# Upper bound on the characters in one token; runs of indentation are
+# single tokens in the CodeGen vocabulary
+MAX_TOKEN_CHARS = 32
+
+# generate() returns only the token ids; scores, attentions and hidden
+# states would be kept for every step and are never read
+OUTPUT_KWARGS = dict(
+    return_dict_in_generate=False,
+    output_scores=False,
+    output_attentions=False,
+    output_hidden_states=False
+)
+
+# Most prompts generated together, and how long the first prompt of a batch
+# waits for others to join it
+MAX_BATCH_SIZE = 8
+BATCH_WINDOW = 0.01
+
+
+class BatchScheduler:
+    """
+    Groups prompts submitted by concurrent requests into batched generations.
+    
+    A worker thread takes the oldest waiting prompt, waits up to BATCH_WINDOW
+    seconds for more to arrive, and generates up to MAX_BATCH_SIZE of them in
+    one call. Decoding a batch costs little more than decoding one sequence,
+    since each step is bound by reading the weights.
+    """
+    
+    def __init__(self, generate_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = MAX_BATCH_SIZE, window: float = BATCH_WINDOW):
+        """
+        Args:
+            generate_batch: Function returning one result per prompt in a list.
+            max_batch_size: Most prompts passed to generate_batch at once.
+            window: Seconds to wait for more prompts after the first arrives.
+        """
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        
+    def submit(self, prompt: Any) -> Future:
+        """
+        Queue a prompt and return a future for its result.
+        """
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+                    self._worker.start()
+        future = Future()
+        self._queue.put((prompt, future))
+        return future
+        
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+                    
+            try:
+                results = self.generate_batch([prompt for prompt, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
 
 
 class CodeExplanationModel:
@@ -20,7 +203,8 @@ class CodeExplanationModel:
     explanations using a sequence-to-sequence transformer model.
     """
     
-    def __init__(self, model_name: str = "Salesforce/codegen-350M-mono", local_model_path: Optional[str] = None):
+    def __init__(self, model_name: str = "Salesforce/codegen-350M-mono", local_model_path: Optional[str] = None,
+                 quantization: Optional[str] = None, do_sample: bool = False):
         """
         Initialize the model.
         
@@ -29,15 +213,35 @@ class CodeExplanationModel:
                         Default is "Salesforce/codegen-350M-mono".
             local_model_path: Optional path to locally saved model.
                               If provided, model will be loaded from this path instead.
+            quantization: Optional weight quantization, "int4" or "int8".
+                          Quantized weights cut the memory read per decode step.
+            do_sample: Sample CodeGen explanations instead of decoding greedily.
+                       Greedy decoding skips the per-step top-k/top-p sort.
         """
+        if quantization is not None and quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unsupported quantization {quantization!r}, expected one of {QUANTIZATION_MODES}")
         self.model_name = model_name
+        self.quantization = quantization
+        self.do_sample = do_sample
         # Ensure we use the model name's last part (e.g., codegen-350M-mono) as the directory name
         model_short_name = model_name.split("/")[-1] if "/" in model_name else model_name
         self.local_model_path = local_model_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_models", model_short_name)
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.dtype = _model_dtype(self.device)
         self.tokenizer = None
         self.model = None
         self.initialized = False
+        self.compiled = False
+        self.static_cache = False
+        self.onnx = False
+        self._load_lock = threading.Lock()
+        # Generation runs one request at a time; a static KV cache is shared
+        self._generate_lock = threading.Lock()
+        self._batcher = BatchScheduler(self._generate_batch)
+        # Explanations by prompt and language. The prompt is built from the
+        # trimmed code, so resubmissions differing only in surrounding
+        # whitespace or language alias skip generation too.
+        self.result_cache = ResultCache(maxsize=1024)
         # Default max length settings - adjust based on model
         if "codebert" in model_name.lower():
             self.max_input_length = 350  # Much more conservative for CodeBERT
@@ -63,11 +267,7 @@ class CodeExplanationModel:
                         trust_remote_code=True,
                         local_files_only=True
                     )
-                    self.model = AutoModelForCausalLM.from_pretrained(
-                        self.local_model_path, 
-                        trust_remote_code=True,
-                        local_files_only=True
-                    ).to(self.device)
+                    self.model = self._from_pretrained(self.local_model_path, local_files_only=True)
                 except Exception as e:
                     print(f"Error loading with local_files_only=True: {e}")
                     print("Trying without local_files_only...")
@@ -75,10 +275,7 @@ class CodeExplanationModel:
                         self.local_model_path,
                         trust_remote_code=True
                     )
-                    self.model = AutoModelForCausalLM.from_pretrained(
-                        self.local_model_path, 
-                        trust_remote_code=True
-                    ).to(self.device)
+                    self.model = self._from_pretrained(self.local_model_path)
                 print("Model loaded successfully from local path")
             else:
                 print(f"Local model path not found: {self.local_model_path}")
@@ -88,12 +285,12 @@ class CodeExplanationModel:
                 os.makedirs(self.local_model_path, exist_ok=True)
                 
                 self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, trust_remote_code=True)
-                self.model = AutoModelForCausalLM.from_pretrained(self.model_name, trust_remote_code=True).to(self.device)
+                self.model = self._from_pretrained(self.model_name)
                 
                 # Save the model locally
                 print(f"Saving model to: {self.local_model_path}")
                 self.tokenizer.save_pretrained(self.local_model_path)
-                self.model.save_pretrained(self.local_model_path)
+                self.model.save_pretrained(self.local_model_path, safe_serialization=True)
                 print(f"Model saved to: {self.local_model_path}")
                 
             # Set padding token if it doesn't exist
@@ -126,12 +323,154 @@ class CodeExplanationModel:
             if self.tokenizer.eos_token is None and self.tokenizer.bos_token is not None:
                 self.tokenizer.eos_token = self.tokenizer.bos_token
                 
+            # Batched prompts are padded on the left, next to the generated text
+            self.tokenizer.padding_side = "left"
+                
+            # Inference only: no dropout, and no gradient tracking on the
+            # weights, including embeddings resized for a padding token
+            if not self.onnx:
+                self.model.eval()
+                self.model.requires_grad_(False)
+                
+            # Quantize last, since adding a padding token resizes the embeddings
+            if self.quantization and not self.onnx:
+                self._quantize()
+            if self.device.type == "cuda" and hasattr(torch, "compile"):
+                self._compile()
+                # A static KV cache keeps the decode step's shapes fixed, so
+                # the compiled graphs are replayed instead of recaptured
+                self.static_cache = bool(getattr(self.model, "_supports_static_cache", False))
+                
             self.initialized = True
             print("Model initialization complete")
         except Exception as e:
             print(f"Error loading model: {e}")
             print(traceback.format_exc())
             self.initialized = False
+            return
+            
+        if self.compiled:
+            self._warmup()
+    
+    def ensure_loaded(self) -> bool:
+        """
+        Load the model unless it is loaded already.
+        
+        Threads that arrive while another is loading wait for that load
+        instead of starting their own.
+        
+        Returns:
+            True if the model is ready to generate.
+        """
+        if not self.initialized:
+            with self._load_lock:
+                if not self.initialized:
+                    self.load_model()
+        return self.initialized
+    
+    def _warmup(self) -> None:
+        """
+        Run a throwaway generation so the first request does not pay for compilation.
+        
+        The first calls of a compiled model trace it, autotune kernels and
+        capture CUDA graphs. Generating twice covers both the first call and
+        the steady-state graphs replayed after it. A failed warmup is only
+        logged; the model still works, and compiles on first use instead.
+        """
+        try:
+            print("Warming up compiled model...")
+            prompt = self._tokenize(self._preprocess_code("pass", "python"))
+            for _ in range(2):
+                self._generate_batch([prompt])
+            print("Warmup complete")
+        except Exception as e:
+            print(f"Warmup failed: {e}")
+    
+    def _from_pretrained(self, path: str, **kwargs):
+        """
+        Load the model weights from a model name or local path onto the device.
+        
+        The fastest attention kernel the model supports is requested:
+        FlashAttention 2 on CUDA with 16-bit weights, then PyTorch's fused
+        scaled_dot_product_attention. Models that support neither, and
+        transformers versions without attn_implementation, keep their
+        default attention.
+        
+        Args:
+            path: Hugging Face model name or local directory.
+            **kwargs: Extra arguments for AutoModelForCausalLM.from_pretrained.
+        """
+        # On CPU, prefer the int8 ONNX export when setup.py has made one
+        onnx_path = os.path.join(path, ONNX_DIR)
+        if self.device.type == "cpu" and HAS_ONNXRUNTIME and os.path.isfile(os.path.join(onnx_path, ONNX_FILE_NAME)):
+            print(f"Loading quantized ONNX model from: {onnx_path}")
+            model = ORTModelForCausalLM.from_pretrained(onnx_path, file_name=ONNX_FILE_NAME, **kwargs)
+            self.onnx = True
+            return model
+            
+        if HAS_ACCELERATE:
+            kwargs.update(low_cpu_mem_usage=True, device_map={"": self.device})
+        attn_implementations = ["sdpa", None]
+        if self.device.type == "cuda" and self.dtype != torch.float32:
+            attn_implementations.insert(0, "flash_attention_2")
+            
+        for attn_implementation in attn_implementations:
+            attn_kwargs = {"attn_implementation": attn_implementation} if attn_implementation else {}
+            try:
+                model = AutoModelForCausalLM.from_pretrained(
+                    path,
+                    trust_remote_code=True,
+                    torch_dtype=self.dtype,
+                    **attn_kwargs,
+                    **kwargs
+                )
+                break
+            except (ValueError, ImportError, TypeError) as e:
+                if attn_implementation is None:
+                    raise
+                print(f"{attn_implementation} attention is not available: {e}")
+        return model if HAS_ACCELERATE else model.to(self.device)
+    
+    def _quantize(self) -> None:
+        """
+        Quantize the weights of the model's linear layers.
+        
+        On CUDA, torchao stores the weights as int4 or int8 and dequantizes
+        them inside the matmul kernels. Its int4 kernels need BF16, so FP16
+        GPUs use int8. On CPU, PyTorch's dynamic int8 quantization is used,
+        which has no int4 variant.
+        """
+        if self.device.type != "cuda":
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+            print("Quantized linear layers to int8")
+        elif not HAS_TORCHAO:
+            print("torchao is not installed, loading model without quantization")
+        elif self.quantization == "int4" and self.dtype == torch.bfloat16:
+            quantize_(self.model, int4_weight_only(group_size=128))
+            print("Quantized model weights to int4")
+        else:
+            quantize_(self.model, int8_weight_only())
+            print("Quantized model weights to int8")
+    
+    def _compile(self) -> None:
+        """
+        Compile the model's forward pass with torch.compile.
+        
+        generate() calls forward once per new token. Compiled, each call runs
+        fused kernels replayed from a CUDA graph instead of dispatching every
+        op from Python. Compilation happens on the first calls; if it fails,
+        dynamo falls back to running the model eagerly.
+        
+        With the static KV cache and bucketed prompt lengths, every decode
+        step of a batch has the same shapes, so one graph is captured per
+        bucket and batch size and replayed for each token. generate() keeps
+        its logits processors (repetition penalty, no-repeat n-grams), which
+        a hand-written replay loop would have to reimplement.
+        """
+        torch._dynamo.config.suppress_errors = True
+        self.model.forward = torch.compile(self.model.forward, mode="reduce-overhead", fullgraph=False)
+        self.compiled = True
+        print("Compiled model forward pass")
     
     def explain_code(self, code: str, language: str) -> Dict[str, Any]:
         """
@@ -144,80 +483,76 @@ class CodeExplanationModel:
         Returns:
             A dictionary containing the explanation and metadata.
         """
+        return self.explain_code_batch([code], [language])[0]
+        
+    def explain_code_batch(self, codes: List[str], languages: List[str]) -> List[Dict[str, Any]]:
+        """
+        Generate explanations for several pieces of code.
+        
+        Every prompt is queued with the batch scheduler before any is waited
+        on, so they are generated together, MAX_BATCH_SIZE per generate()
+        call.
+        
+        Args:
+            codes: The source code to explain.
+            languages: The programming language of each piece of code.
+            
+        Returns:
+            A dictionary containing the explanation and metadata for each
+            piece of code, in order.
+        """
         if not self.initialized:
             print("Model not initialized. Attempting to load...")
-            self.load_model()
             
-        if not self.initialized:
+        if not self.ensure_loaded():
             print("Failed to initialize model")
-            return {"error": "Failed to load NLP model"}
+            return [{"error": "Failed to load NLP model"} for _ in codes]
             
+        requests = [self._submit(code, language) for code, language in zip(codes, languages)]
+        return [self._explanation(language, key, pending) for language, (key, pending) in zip(languages, requests)]
+        
+    def _submit(self, code: str, language: str) -> Tuple[Optional[tuple], Any]:
+        """
+        Preprocess code and queue its prompt for generation.
+        
+        Returns:
+            The result cache key and either the cached result or a Future of
+            the generated (text, new token count).
+        """
         try:
             # Preprocess the code
             preprocessed_code = self._preprocess_code(code, language)
             print(f"Preprocessed code length: {len(preprocessed_code)} chars")
             
-            # Tokenize the code
-            encoded_input = self.tokenizer(
-                preprocessed_code, 
-                return_tensors="pt",
-                truncation=True, 
-                padding=False,
-                max_length=self.max_input_length
-            ).to(self.device)
+            key = ResultCache.key(preprocessed_code, language)
+            result = self.result_cache.get(key)
+            if result is not None:
+                return key, result
+                
+            # Generate explanation, batched with any concurrent requests
+            print("Generating explanation...")
+            return key, self._batcher.submit(self._tokenize(preprocessed_code))
             
-            input_ids = encoded_input["input_ids"]
-            attention_mask = encoded_input.get("attention_mask")
-            input_length = input_ids.shape[1]
-            print(f"Input sequence length: {input_length} tokens")
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+            return None, future
             
-            # Generate explanation using improved parameters
-            print("Generating explanation...")
-            with torch.no_grad():
-                # Use different parameters based on the model
-                if "codebert" in self.model_name.lower():
-                    # CodeBERT is not designed for generation, use minimal parameters
-                    outputs = self.model.generate(
-                        input_ids=input_ids,
-                        attention_mask=attention_mask,
-                        max_new_tokens=30,  # Very short for CodeBERT
-                        do_sample=False,    # Use greedy decoding
-                        pad_token_id=self.tokenizer.pad_token_id,
-                        eos_token_id=self.tokenizer.eos_token_id
-                    )
-                else:
-                    # CodeGen with optimized parameters
-                    outputs = self.model.generate(
-                        input_ids=input_ids,
-                        attention_mask=attention_mask,
-                        max_new_tokens=80,  # Focused, shorter responses
-                        do_sample=True,
-                        top_p=0.85,         # More focused sampling
-                        top_k=30,           # Reduced top_k for better quality
-                        temperature=0.6,    # Lower temperature for coherence
-                        num_return_sequences=1,
-                        pad_token_id=self.tokenizer.pad_token_id,
-                        eos_token_id=self.tokenizer.eos_token_id,
-                        repetition_penalty=1.2,  # Higher penalty to reduce repetition
-                        no_repeat_ngram_size=3   # Avoid repeating 3-grams
-                    )
+    def _explanation(self, language: str, key: Optional[tuple], pending: Any) -> Dict[str, Any]:
+        """
+        Wait for a prompt queued by _submit and turn its generated text into the result.
+        """
+        if not isinstance(pending, Future):
+            return pending
             
-            # Check if generation worked
-            output_length = outputs.shape[1]
-            new_tokens = output_length - input_length
-            print(f"Output sequence length: {output_length} tokens, new tokens: {new_tokens}")
+        try:
+            explanation, new_tokens = pending.result()
+            print(f"New tokens: {new_tokens}")
             
             if new_tokens <= 0:
                 print("Warning: No new tokens generated")
                 return {"error": "Model did not generate any explanation"}
                 
-            # Only decode the newly generated tokens, not the input
-            explanation = self.tokenizer.decode(
-                outputs[0][input_length:], 
-                skip_special_tokens=True,
-                clean_up_tokenization_spaces=True
-            )
-            
             # Clean up the explanation
             explanation = self._clean_explanation(explanation)
             
@@ -232,18 +567,172 @@ class CodeExplanationModel:
             # Parse the explanation into structured format
             structured_explanation = self._structure_explanation(explanation)
             
-            return {
+            result = {
                 "raw_explanation": explanation,
                 "structured_explanation": structured_explanation,
                 "language": language,
                 "model_used": self.model_name
             }
+            self.result_cache.put(key, result)
+            return result
             
         except Exception as e:
             print(f"Error generating explanation: {str(e)}")
             print(traceback.format_exc())
             return {"error": f"Error generating explanation: {str(e)}"}
     
+    def _tokenize(self, prompt: str) -> List[int]:
+        """
+        Tokenize a preprocessed prompt, truncated to max_input_length.
+        
+        Requests tokenize their own prompt before queueing it, so this CPU
+        work overlaps with the batch the scheduler is generating.
+        """
+        return self.tokenizer(
+            prompt,
+            truncation=True,
+            padding=False,
+            max_length=self.max_input_length
+        )["input_ids"]
+    
+    def _generate_batch(self, prompts: List[List[int]]) -> List[Tuple[str, int]]:
+        """
+        Generate explanations for several prompts with one generate() call.
+        
+        Args:
+            prompts: Token ids of preprocessed prompts, as returned by _tokenize.
+            
+        Returns:
+            The decoded new text and the number of new tokens for each prompt.
+        """
+        # Left-pad the prompts to a common length so that every sequence
+        # continues right after its own prompt
+        encoded = {"input_ids": prompts, "attention_mask": [[1] * len(ids) for ids in prompts]}
+        longest = max(len(ids) for ids in prompts)
+        encoded_input = self.tokenizer.pad(
+            encoded,
+            padding="max_length",
+            max_length=self._padded_length(longest),
+            return_tensors="pt"
+        )
+        
+        input_ids = self._to_device(encoded_input["input_ids"])
+        attention_mask = self._to_device(encoded_input["attention_mask"])
+        input_length = input_ids.shape[1]
+        print(f"Batch of {len(prompts)}, input sequence length: {input_length} tokens")
+        
+        cache_kwargs = {"cache_implementation": "static"} if self.static_cache else {}
+        with self._generate_lock, torch.inference_mode():
+            # Use different parameters based on the model
+            if "codebert" in self.model_name.lower():
+                # CodeBERT is not designed for generation, use minimal parameters
+                outputs = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    max_new_tokens=30,  # Very short for CodeBERT
+                    do_sample=False,    # Use greedy decoding
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    eos_token_id=self.tokenizer.eos_token_id,
+                    use_cache=True,
+                    **OUTPUT_KWARGS,
+                    **cache_kwargs
+                )
+            else:
+                # CodeGen with optimized parameters. Greedy by default; the
+                # repetition settings keep it from looping.
+                sample_kwargs = dict(
+                    top_p=0.85,         # More focused sampling
+                    top_k=30,           # Reduced top_k for better quality
+                    temperature=0.6     # Lower temperature for coherence
+                ) if self.do_sample else {}
+                outputs = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    max_new_tokens=80,  # Focused, shorter responses
+                    do_sample=self.do_sample,
+                    num_beams=1,
+                    num_return_sequences=1,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    eos_token_id=self.tokenizer.eos_token_id,
+                    repetition_penalty=1.2,  # Higher penalty to reduce repetition
+                    no_repeat_ngram_size=3,  # Avoid repeating 3-grams
+                    use_cache=True,
+                    **OUTPUT_KWARGS,
+                    **sample_kwargs,
+                    **cache_kwargs
+                )
+                
+        # Only decode the newly generated tokens, not the input. They are
+        # copied to the host once, for both decoding and counting. Sequences
+        # that finish early are padded to the longest one.
+        new_outputs = outputs[:, input_length:].cpu()
+        texts = self.tokenizer.batch_decode(
+            new_outputs,
+            skip_special_tokens=True,
+            clean_up_tokenization_spaces=True
+        )
+        counts = (new_outputs != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+        return list(zip(texts, counts))
+    
+    def _to_device(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Copy an input tensor to the model's device.
+        
+        On CUDA the tensor is pinned first so the copy is asynchronous and
+        queues behind any GPU work still running, instead of blocking.
+        """
+        if self.device.type == "cuda":
+            return tensor.pin_memory().to(self.device, non_blocking=True)
+        return tensor.to(self.device)
+    
+    def _padded_length(self, length: int) -> int:
+        """
+        Return the length to pad a batch of prompts to.
+        
+        A compiled model is traced and graph-captured again for every new
+        input shape, so its prompts are padded up to the next of a few fixed
+        lengths. Eager models pad only to the longest prompt.
+        """
+        if not self.compiled:
+            return length
+        for bucket in INPUT_LENGTH_BUCKETS:
+            if length <= bucket < self.max_input_length:
+                return bucket
+        return self.max_input_length
+    
+    def _truncate_code(self, code: str) -> str:
+        """
+        Cut code down to the tokens that fit in the prompt.
+        
+        The tokenizer truncates prompts from the end, which would drop the
+        instruction that follows the code. Instead the code itself is cut
+        at a token boundary, leaving PROMPT_RESERVED_TOKENS for the rest of
+        the prompt.
+        """
+        budget = self.max_input_length - PROMPT_RESERVED_TOKENS
+        # Every token covers at least one character
+        if len(code) <= budget:
+            return code
+            
+        # No token is longer than MAX_TOKEN_CHARS, so the tail past that
+        # many characters per token is never needed
+        head = code[:budget * MAX_TOKEN_CHARS]
+        if self.tokenizer.is_fast:
+            encoded = self.tokenizer(head, add_special_tokens=False, truncation=True, max_length=budget,
+                                     return_offsets_mapping=True)
+            offsets = encoded["offset_mapping"]
+            end = offsets[-1][1] if offsets else 0
+            truncated = head[:end]
+        else:
+            ids = self.tokenizer(head, add_special_tokens=False, truncation=True, max_length=budget)["input_ids"]
+            truncated = self.tokenizer.decode(ids)
+            end = len(truncated)
+            
+        if end >= len(code.rstrip()):
+            return code
+        print(f"Code is too long ({len(code)} chars), truncating to {budget} tokens")
+        return truncated + "\n# ... code truncated for brevity ...\n"
+    
     def _preprocess_code(self, code: str, language: str) -> str:
         """
         Preprocess the code before sending it to the model.
@@ -255,23 +744,13 @@ class CodeExplanationModel:
         Returns:
             The preprocessed code as a string.
         """
-        # If code is longer than 1500 characters, truncate it
-        if len(code) > 1500:
-            print(f"Code is too long ({len(code)} chars), truncating to 1500 chars")
-            code = code[:1500] + "\n# ... code truncated for brevity ...\n"
-            
         # Create instruction-based prompts that force natural language explanations
         if "codebert" in self.model_name.lower():
             # Disable CodeBERT for now as it's not working well for generation
-            preprocessed = f"""Explain what this code does: {code.strip()[:200]}...
-Answer:"""
+            preprocessed = CODEBERT_PROMPT.format(code=code.strip()[:200])
         else:
             # For CodeGen, use a very simple format that forces explanation
-            preprocessed = f"""{language} code:
-{code.strip()}
-
-What does this code do?
-This code"""
+            preprocessed = CODEGEN_PROMPT.format(language=language, code=self._truncate_code(code.strip()).strip())
         
         return preprocessed
     
@@ -341,28 +820,7 @@ This code"""
         """Create a simple, user-friendly summary of what the code does."""
         explanation_lower = explanation.lower()
         
-        # Common programming patterns and their user-friendly descriptions
-        patterns = {
-            'function': 'defines functions that can be called to perform specific tasks',
-            'class': 'creates classes which are blueprints for objects',
-            'variable': 'stores data in variables for later use',
-            'loop': 'repeats certain operations multiple times',
-            'condition': 'makes decisions based on certain conditions',
-            'import': 'brings in external libraries or modules',
-            'print': 'displays output or information to the user',
-            'input': 'gets information from the user',
-            'calculate': 'performs mathematical calculations',
-            'process': 'processes or manipulates data',
-            'file': 'works with files (reading, writing, or managing)',
-            'database': 'interacts with databases to store or retrieve information',
-            'api': 'communicates with external services or APIs',
-            'web': 'creates web applications or handles web requests'
-        }
-        
-        found_patterns = []
-        for pattern, description in patterns.items():
-            if pattern in explanation_lower:
-                found_patterns.append(description)
+        found_patterns = [description for pattern, description in _SUMMARY_PATTERNS if pattern in explanation_lower]
         
         if found_patterns:
             if len(found_patterns) == 1:
@@ -376,8 +834,6 @@ This code"""
     
     def _clean_explanation(self, explanation: str) -> str:
         """Clean up the generated explanation to remove artifacts and improve quality."""
-        import re
-        
         if not explanation or len(explanation.strip()) < 5:
             return "creates and defines programming functionality to perform specific tasks"
         
@@ -388,22 +844,21 @@ This code"""
         original_cleaned = cleaned
         
         # Remove problematic patterns but be less aggressive
-        cleaned = re.sub(r'will be executed when.*?shell', 'performs operations', cleaned)
-        cleaned = re.sub(r'you type.*?command', 'when executed', cleaned)
-        cleaned = re.sub(r'print on screen.*?happen', 'displays output', cleaned)
+        for pattern, replacement in _ARTIFACT_PATTERNS:
+            cleaned = pattern.sub(replacement, cleaned)
         
         # Only remove these if they're clearly broken
         if 'because we are using' in cleaned and len(cleaned) < 50:
-            cleaned = re.sub(r'because we are using.*?purpose', '', cleaned)
+            cleaned = _BECAUSE_RE.sub('', cleaned)
         if 'We should use' in cleaned and len(cleaned) < 50:
-            cleaned = re.sub(r'We should use.*?statement', '', cleaned)
+            cleaned = _SHOULD_USE_RE.sub('', cleaned)
         
         # Remove trailing fragments only if they're clearly broken
-        cleaned = re.sub(r'\binstead so as to avoid.*', '', cleaned)
-        cleaned = re.sub(r'\bExample.*$', '', cleaned)
+        for pattern in _TRAILING_FRAGMENT_PATTERNS:
+            cleaned = pattern.sub('', cleaned)
         
         # Clean up spacing
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+        cleaned = _WHITESPACE_RE.sub(' ', cleaned).strip()
         
         # If cleaning removed too much meaningful content, use original
         if len(cleaned) < len(original_cleaned) * 0.5 and len(original_cleaned) > 20:
@@ -433,20 +888,28 @@ class ModelManager:
     """
     
     _instances: Dict[str, CodeExplanationModel] = {}
+    _lock = threading.Lock()
     
     @classmethod
-    def get_model(cls, model_name: str = "Salesforce/codegen-350M-mono", local_model_path: Optional[str] = None) -> CodeExplanationModel:
+    def get_model(cls, model_name: str = "Salesforce/codegen-350M-mono", local_model_path: Optional[str] = None,
+                  quantization: Optional[str] = DEFAULT_QUANTIZATION) -> CodeExplanationModel:
         """
-        Get or create a model instance.
+        Get or create a model instance, loading it on first use.
         
         Args:
             model_name: The name of the pretrained model to use.
             local_model_path: Optional path to locally saved model.
+            quantization: Optional weight quantization for a newly created model.
             
         Returns:
-            An instance of CodeExplanationModel.
+            An instance of CodeExplanationModel. If loading failed, it is
+            returned uninitialized and loading is retried on its next use.
         """
-        if model_name not in cls._instances:
-            cls._instances[model_name] = CodeExplanationModel(model_name, local_model_path)
-            
-        return cls._instances[model_name] 
\ No newline at end of file
+        with cls._lock:
+            model = cls._instances.get(model_name)
+            if model is None:
+                model = cls._instances[model_name] = CodeExplanationModel(model_name, local_model_path, quantization)
+                
+        # Concurrent first callers share one load instead of each reading the weights
+        model.ensure_loaded()
+        return model 
\ No newline at end of file
@@ -7,9 +7,12 @@ fine-tuning models, and evaluating their performance.
 
 import os
 import json
+import shutil
+import tempfile
+from itertools import chain, islice
 import torch
 import numpy as np
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, IterableDataset, get_worker_info
 from transformers import (
     T5ForConditionalGeneration,
     AutoTokenizer,
@@ -17,87 +20,443 @@ from transformers import (
     Seq2SeqTrainingArguments,
     DataCollatorForSeq2Seq
 )
-from typing import Dict, Any, List, Tuple, Optional
+from transformers.training_args import OptimizerNames
+from datasets import Dataset as ArrowDataset, Features, Sequence, Value, load_dataset, load_from_disk
+from typing import Dict, Any, Iterable, Iterator, List, Tuple, Optional
+
+# Optional: incremental parsing of large JSON training sets
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional: faster parsing of JSON Lines training sets
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Token ids are stored as int32, half the size of int64 and enough for any
+# vocabulary. Batches are still built as int64, which the loss requires.
+TOKEN_DTYPE = np.int32
+
+# Batches are padded up to a multiple of this, which suits tensor cores
+PAD_TO_MULTIPLE_OF = 8
+
+# Samples tokenized at a time, so only one chunk of raw text is held in memory
+ENCODE_CHUNK_SIZE = 10_000
+
+# Samples each DataLoader worker tokenizes at a time when streaming
+STREAM_CHUNK_SIZE = 64
+
+# File in a cache directory describing what the cache was built from
+CACHE_MANIFEST = "manifest.json"
+
+# Columns of a cached training set, stored as int32 like TOKEN_DTYPE
+CACHE_FEATURES = Features({
+    "input_ids": Sequence(Value("int32")),
+    "labels": Sequence(Value("int32")),
+    "length": Value("int32")
+})
+
+
+def _flatten(sequences: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return token id lists as one flat array and the length of each list."""
+    lengths = np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences))
+    flat = np.fromiter(chain.from_iterable(sequences), dtype=TOKEN_DTYPE, count=int(lengths.sum()))
+    return flat, lengths
+
+
+def _offsets(lengths: np.ndarray) -> np.ndarray:
+    """Return where each of the sequences with these lengths starts, and the total length."""
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _tokenize(tokenizer, texts: List[str], max_length: int, **kwargs) -> List[List[int]]:
+    """
+    Tokenize texts in one batch, encoding each distinct text only once.
+    
+    Training sets often repeat a snippet with several explanations, or an
+    explanation across snippets; duplicates share the token ids of their
+    first occurrence.
+    """
+    unique = list(dict.fromkeys(texts))
+    encodings = tokenizer(unique, truncation=True, max_length=max_length, **kwargs)
+    token_ids = dict(zip(unique, encodings["input_ids"]))
+    return [token_ids[text] for text in texts]
+
+
+def _encode_inputs(tokenizer, samples: List[Dict[str, str]], max_length: int,
+                   prefixes: Dict[str, List[int]]) -> List[List[int]]:
+    """
+    Tokenize the model inputs of samples: a language marker if known, then the code.
+    
+    Only the code is tokenized per sample. The "<language>\n" marker of each
+    language is tokenized once and kept in prefixes for later samples.
+    """
+    budget = max_length - tokenizer.num_special_tokens_to_add()
+    code_ids = _tokenize(tokenizer, [item["code"] for item in samples], budget, add_special_tokens=False)
+    inputs = []
+    for item, ids in zip(samples, code_ids):
+        language = item.get("language", "")
+        prefix = prefixes.get(language)
+        if prefix is None:
+            prefix = tokenizer(f"<{language}>\n", add_special_tokens=False)["input_ids"] if language else []
+            prefixes[language] = prefix
+        inputs.append(tokenizer.build_inputs_with_special_tokens(prefix + ids[:max(budget - len(prefix), 0)]))
+    return inputs
+
+
+def encode_data(data: Iterable[Dict[str, str]], tokenizer, max_input_length: int = 512,
+                max_target_length: int = 256) -> Dict[str, np.ndarray]:
+    """
+    Tokenize code-explanation pairs into flat token id arrays.
+    
+    Samples are encoded ENCODE_CHUNK_SIZE at a time, inputs and targets each
+    in one call, so the fast tokenizer processes them in its Rust batch path
+    instead of one string at a time. Only the token ids are kept, so data can
+    be a stream such as iter_training_data.
+    
+    Args:
+        data: Iterable of dictionaries with 'code' and 'explanation' keys.
+        tokenizer: The tokenizer to use.
+        max_input_length: Maximum length for input text.
+        max_target_length: Maximum length for target text.
+        
+    Returns:
+        Dictionary of input_ids, input_offsets, labels and label_offsets
+        arrays. Samples are not padded: the token ids of all samples are
+        stored end to end, and sample i spans offsets[i]:offsets[i + 1]. The
+        collator pads each batch to its own longest sample.
+    """
+    input_ids, input_lengths = [np.empty(0, dtype=TOKEN_DTYPE)], [np.empty(0, dtype=np.int64)]
+    labels, label_lengths = [np.empty(0, dtype=TOKEN_DTYPE)], [np.empty(0, dtype=np.int64)]
+    samples = iter(data)
+    prefixes = {}
+    while True:
+        chunk = list(islice(samples, ENCODE_CHUNK_SIZE))
+        if not chunk:
+            break
+        ids, lengths = _flatten(_encode_inputs(tokenizer, chunk, max_input_length, prefixes))
+        input_ids.append(ids)
+        input_lengths.append(lengths)
+        ids, lengths = _flatten(_tokenize(tokenizer, [item["explanation"] for item in chunk], max_target_length))
+        labels.append(ids)
+        label_lengths.append(lengths)
+    
+    return {
+        "input_ids": np.concatenate(input_ids),
+        "input_offsets": _offsets(np.concatenate(input_lengths)),
+        "labels": np.concatenate(labels),
+        "label_offsets": _offsets(np.concatenate(label_lengths))
+    }
+
+
+def _cache_manifest(data_path: str, tokenizer, max_input_length: int,
+                    max_target_length: int) -> Dict[str, Any]:
+    """Return what a cache built from these arguments depends on."""
+    stat = os.stat(data_path)
+    return {
+        "data_path": os.path.abspath(data_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "tokenizer": tokenizer.name_or_path,
+        "max_input_length": max_input_length,
+        "max_target_length": max_target_length
+    }
+
+
+def load_cache(data_path: str, tokenizer, cache_path: str, max_input_length: int = 512,
+               max_target_length: int = 256) -> Optional[ArrowDataset]:
+    """
+    Load a dataset saved by build_cache, if it was built from the same data.
+    
+    Args:
+        data_path: Path to the training data the cache should be built from.
+        tokenizer: The tokenizer the cache should be built with.
+        cache_path: Directory the dataset was saved to.
+        max_input_length: Maximum length for input text.
+        max_target_length: Maximum length for target text.
+        
+    Returns:
+        The tokenized dataset, or None if there is no cache or it was built
+        from a different data file, tokenizer or maximum lengths.
+    """
+    try:
+        with open(os.path.join(cache_path, CACHE_MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest != _cache_manifest(data_path, tokenizer, max_input_length, max_target_length):
+        return None
+    return load_from_disk(cache_path)
+
+
+def build_cache(data_path: str, tokenizer, out_path: str, max_input_length: int = 512,
+                max_target_length: int = 256, num_proc: Optional[int] = None) -> ArrowDataset:
+    """
+    Tokenize a training data file into a dataset saved on disk.
+    
+    The file is tokenized by num_proc processes with the datasets library and
+    saved as Arrow files, which load_from_disk memory-maps: later runs start
+    without parsing or tokenizing anything, and DataLoader workers share the
+    pages instead of each holding a copy. Samples are unpadded, with a
+    length column the Trainer uses to group them by length.
+    
+    The dataset is written to a temporary directory next to out_path and
+    renamed into place with a manifest of what it was built from, which
+    load_cache checks, so an interrupted build never leaves a partial cache.
+    
+    Args:
+        data_path: Path to the JSON or JSON Lines file containing training data.
+        tokenizer: The tokenizer to use.
+        out_path: Directory to save the dataset to.
+        max_input_length: Maximum length for input text.
+        max_target_length: Maximum length for target text.
+        num_proc: Number of processes to tokenize with.
+        
+    Returns:
+        The tokenized dataset.
+    """
+    prefixes = {}
+    
+    def encode(batch: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+        samples = [dict(zip(batch, values)) for values in zip(*batch.values())]
+        input_ids = _encode_inputs(tokenizer, samples, max_input_length, prefixes)
+        return {
+            "input_ids": input_ids,
+            "labels": _tokenize(tokenizer, batch["explanation"], max_target_length),
+            "length": [len(ids) for ids in input_ids]
+        }
+    
+    # Taken before tokenizing, so a file changed meanwhile fails the check later
+    manifest = _cache_manifest(data_path, tokenizer, max_input_length, max_target_length)
+    dataset = load_dataset("json", data_files=data_path, split="train")
+    dataset = dataset.map(encode, batched=True, num_proc=num_proc, remove_columns=dataset.column_names,
+                          features=CACHE_FEATURES)
+    
+    out_path = os.path.abspath(out_path)
+    tmp_path = tempfile.mkdtemp(prefix=os.path.basename(out_path) + ".", dir=os.path.dirname(out_path))
+    try:
+        dataset.save_to_disk(tmp_path)
+        with open(os.path.join(tmp_path, CACHE_MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        # A directory cannot be renamed over a non-empty one, so remove a stale cache first
+        if os.path.isdir(out_path):
+            shutil.rmtree(out_path)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return dataset
 
 
 class CodeExplanationDataset(Dataset):
-    """Dataset class for code-explanation pairs."""
+    """
+    Dataset class for code-explanation pairs.
+    
+    The corpus is tokenized once when the dataset is created, so items are
+    slices of preallocated arrays and no tokenization runs while training.
+    Items are unpadded lists of token ids, to be padded per batch by
+    DataCollatorForSeq2Seq.
+    """
     
-    def __init__(self, data: List[Dict[str, str]], tokenizer, max_input_length: int = 512, max_target_length: int = 256):
+    def __init__(self, data: Iterable[Dict[str, str]], tokenizer, max_input_length: int = 512, max_target_length: int = 256):
         """
         Initialize the dataset.
         
         Args:
-            data: List of dictionaries with 'code' and 'explanation' keys.
+            data: Iterable of dictionaries with 'code' and 'explanation' keys.
             tokenizer: The tokenizer to use.
             max_input_length: Maximum length for input text.
             max_target_length: Maximum length for target text.
         """
-        self.data = data
         self.tokenizer = tokenizer
-        self.max_input_length = max_input_length
-        self.max_target_length = max_target_length
+        arrays = encode_data(data, tokenizer, max_input_length, max_target_length)
+        self.input_ids = arrays["input_ids"]
+        self.input_offsets = arrays["input_offsets"]
+        self.labels = arrays["labels"]
+        self.label_offsets = arrays["label_offsets"]
     
     def __len__(self):
-        return len(self.data)
+        return len(self.input_offsets) - 1
     
-    def __getitem__(self, idx) -> Dict[str, torch.Tensor]:
-        item = self.data[idx]
-        code = item["code"]
-        explanation = item["explanation"]
-        language = item.get("language", "")
-        
-        # Preprocess input with language marker
-        if language:
-            input_text = f"<{language}>\n{code}"
-        else:
-            input_text = code
-            
-        input_encodings = self.tokenizer(
-            input_text,
-            truncation=True,
-            max_length=self.max_input_length,
-            padding="max_length",
-            return_tensors="pt"
-        )
-        
-        target_encodings = self.tokenizer(
-            explanation,
-            truncation=True,
-            max_length=self.max_target_length,
-            padding="max_length",
-            return_tensors="pt"
-        )
-        
-        input_ids = input_encodings["input_ids"].squeeze()
-        attention_mask = input_encodings["attention_mask"].squeeze()
-        labels = target_encodings["input_ids"].squeeze()
-        labels[labels == self.tokenizer.pad_token_id] = -100  # Replace pad tokens
-        
+    def __getitem__(self, idx) -> Dict[str, List[int]]:
+        input_ids = self.input_ids[self.input_offsets[idx]:self.input_offsets[idx + 1]].tolist()
         return {
             "input_ids": input_ids,
-            "attention_mask": attention_mask,
-            "labels": labels
+            "attention_mask": [1] * len(input_ids),
+            "labels": self.labels[self.label_offsets[idx]:self.label_offsets[idx + 1]].tolist()
         }
 
 
-def load_training_data(data_path: str) -> List[Dict[str, str]]:
+class CodeExplanationIterableDataset(IterableDataset):
+    """
+    Dataset streaming code-explanation pairs from training data files.
+    
+    Nothing is loaded up front: each DataLoader worker reads its share of the
+    samples from disk and tokenizes them STREAM_CHUNK_SIZE at a time, so
+    memory use does not grow with the corpus. With at least as many files as
+    workers, each worker reads its own files; otherwise every worker reads
+    all files and keeps every n-th sample.
+    """
+    
+    def __init__(self, data_paths: List[str], tokenizer, max_input_length: int = 512, max_target_length: int = 256):
+        """
+        Initialize the dataset.
+        
+        Args:
+            data_paths: Paths to JSON or JSON Lines training data files.
+            tokenizer: The tokenizer to use.
+            max_input_length: Maximum length for input text.
+            max_target_length: Maximum length for target text.
+        """
+        self.data_paths = list(data_paths)
+        self.tokenizer = tokenizer
+        self.max_input_length = max_input_length
+        self.max_target_length = max_target_length
+        
+    def _samples(self) -> Iterator[Dict[str, str]]:
+        worker = get_worker_info()
+        worker_id, num_workers = (worker.id, worker.num_workers) if worker else (0, 1)
+        if len(self.data_paths) >= num_workers:
+            paths = self.data_paths[worker_id::num_workers]
+            return chain.from_iterable(map(iter_training_data, paths))
+        samples = chain.from_iterable(map(iter_training_data, self.data_paths))
+        return islice(samples, worker_id, None, num_workers)
+        
+    def __iter__(self) -> Iterator[Dict[str, List[int]]]:
+        samples = self._samples()
+        prefixes = {}
+        while True:
+            chunk = list(islice(samples, STREAM_CHUNK_SIZE))
+            if not chunk:
+                return
+            input_ids = _encode_inputs(self.tokenizer, chunk, self.max_input_length, prefixes)
+            labels = _tokenize(self.tokenizer, [item["explanation"] for item in chunk], self.max_target_length)
+            for ids, label_ids in zip(input_ids, labels):
+                yield {
+                    "input_ids": ids,
+                    "attention_mask": [1] * len(ids),
+                    "labels": label_ids
+                }
+
+
+def _precision_kwargs(mixed_precision: bool) -> Dict[str, bool]:
+    """
+    Return the Seq2SeqTrainingArguments precision settings for this machine.
+    
+    bf16 is used on GPUs that support it and fp16 on other GPUs. TF32 matmuls
+    are enabled on Ampere and newer GPUs for whatever still runs in fp32.
+    """
+    if not torch.cuda.is_available():
+        return {}
+    use_bf16 = mixed_precision and torch.cuda.is_bf16_supported()
+    return {
+        "bf16": use_bf16,
+        "fp16": mixed_precision and not use_bf16,
+        "tf32": torch.cuda.get_device_capability()[0] >= 8
+    }
+
+
+def _dataloader_kwargs(num_workers: int, prefetch_factor: int = 2) -> Dict[str, Any]:
+    """
+    Return the Seq2SeqTrainingArguments settings for loading batches.
+    
+    With workers, batches are collated in background processes while the
+    model trains, and pinned memory lets them be copied to the GPU
+    asynchronously.
+    """
+    kwargs = {
+        "dataloader_num_workers": num_workers,
+        "dataloader_pin_memory": torch.cuda.is_available()
+    }
+    # dataloader_prefetch_factor needs transformers 4.38 and worker processes
+    if num_workers > 0 and "dataloader_prefetch_factor" in Seq2SeqTrainingArguments.__dataclass_fields__:
+        kwargs["dataloader_prefetch_factor"] = prefetch_factor
+    return kwargs
+
+
+def _compile_kwargs(use_compile: bool) -> Dict[str, Any]:
     """
-    Load training data from a JSON file.
+    Return the Seq2SeqTrainingArguments settings for compiling the model with torch.compile.
+    
+    Compilation needs PyTorch 2 and transformers 4.27, and is only used on a
+    GPU. Batches are padded to a multiple of PAD_TO_MULTIPLE_OF, which keeps
+    the number of distinct shapes, and so of recompilations, small.
+    """
+    if not (use_compile and torch.cuda.is_available() and hasattr(torch, "compile")):
+        return {}
+    if "torch_compile_backend" not in Seq2SeqTrainingArguments.__dataclass_fields__:
+        return {}
+    return {
+        "torch_compile": True,
+        "torch_compile_backend": "inductor",
+        "torch_compile_mode": "default"
+    }
+
+
+def _optimizer_kwargs() -> Dict[str, str]:
+    """
+    Return the Seq2SeqTrainingArguments optimizer setting.
+    
+    On a GPU, AdamW's fused CUDA implementation updates all parameters in a
+    few kernels instead of looping over them in Python. It needs PyTorch 2
+    and transformers 4.27.
+    """
+    if torch.cuda.is_available() and "adamw_torch_fused" in {name.value for name in OptimizerNames}:
+        return {"optim": "adamw_torch_fused"}
+    return {}
+
+
+def _read_training_data(data_path: str) -> Iterator[Dict[str, str]]:
+    if data_path.endswith(".jsonl"):
+        loads = orjson.loads if orjson is not None else json.loads
+        with open(data_path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield loads(line)
+    elif ijson is not None:
+        with open(data_path, 'rb') as f:
+            yield from ijson.items(f, 'item')
+    else:
+        with open(data_path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+
+
+def iter_training_data(data_path: str) -> Iterator[Dict[str, str]]:
+    """
+    Read training data one sample at a time.
+    
+    A .jsonl file holds one JSON sample per line. Any other file holds a JSON
+    array of samples, which is parsed incrementally when ijson is installed
+    and loaded whole otherwise.
     
     Args:
-        data_path: Path to the JSON file containing training data.
+        data_path: Path to the JSON or JSON Lines file containing training data.
         
     Returns:
-        List of dictionaries with 'code' and 'explanation' keys.
+        Iterator of dictionaries with 'code' and 'explanation' keys.
     """
     if not os.path.exists(data_path):
         raise FileNotFoundError(f"Training data file not found: {data_path}")
         
-    with open(data_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    return _read_training_data(data_path)
+
+
+def load_training_data(data_path: str) -> List[Dict[str, str]]:
+    """
+    Load training data from a JSON or JSON Lines file.
+    
+    Args:
+        data_path: Path to the JSON or JSON Lines file containing training data.
         
-    return data
+    Returns:
+        List of dictionaries with 'code' and 'explanation' keys.
+    """
+    return list(iter_training_data(data_path))
 
 
 def train_model(
@@ -107,31 +466,63 @@ def train_model(
     output_dir: str = "./trained_model",
     num_train_epochs: int = 3,
     batch_size: int = 8,
-    learning_rate: float = 5e-5
+    learning_rate: float = 5e-5,
+    cache_dir: Optional[str] = None,
+    mixed_precision: bool = True,
+    num_workers: int = min(8, (os.cpu_count() or 1) // 2),
+    use_compile: bool = True,
+    gradient_checkpointing: bool = True,
+    gradient_accumulation_steps: int = 1,
+    group_by_length: bool = True,
+    streaming: bool = False,
+    max_steps: int = -1
 ) -> None:
     """
     Fine-tune a model on code explanation data.
     
+    To train on several GPUs, call this from a script launched with
+    `torchrun --nproc_per_node=NGPU script.py` or
+    `accelerate launch --multi_gpu --num_processes=NGPU script.py`. Each
+    process then trains on its own share of every batch, so batch_size is
+    per GPU.
+    
     Args:
         model_name: The name of the pretrained model to fine-tune.
         train_data_path: Path to the training data.
         eval_data_path: Optional path to evaluation data.
         output_dir: Directory to save the fine-tuned model.
         num_train_epochs: Number of training epochs.
-        batch_size: Training batch size.
+        batch_size: Training batch size per device.
         learning_rate: Learning rate for training.
+        cache_dir: Optional directory for the tokenized training data. It is
+            built from train_data_path on the first run and reused after,
+            and rebuilt if the data file or the tokenizer changes.
+        mixed_precision: Whether to train in bf16 or fp16 on a GPU.
+        num_workers: Number of worker processes loading batches.
+        use_compile: Whether to compile the model with torch.compile on a GPU.
+        gradient_checkpointing: Whether to recompute activations during the
+            backward pass instead of storing them, which saves memory for
+            larger batches at the cost of extra compute.
+        gradient_accumulation_steps: Number of batches to accumulate
+            gradients over before each optimizer step.
+        group_by_length: Whether to batch training samples of similar input
+            length together, so batches need less padding.
+        streaming: Whether to read and tokenize the training data while
+            training instead of up front, for corpora too large for memory.
+            A streamed dataset has no length, so max_steps must be set, and
+            samples are not grouped by length.
+        max_steps: Number of training steps to run. If positive, it
+            overrides num_train_epochs.
     """
+    if streaming and max_steps <= 0:
+        raise ValueError("max_steps must be set when streaming the training data")
+        
     # Load the model and tokenizer
     tokenizer = AutoTokenizer.from_pretrained(model_name)
     model = T5ForConditionalGeneration.from_pretrained(model_name)
-    
-    # Load the data
-    train_data = load_training_data(train_data_path)
-    eval_data = load_training_data(eval_data_path) if eval_data_path else None
-    
-    # Create the datasets
-    train_dataset = CodeExplanationDataset(train_data, tokenizer)
-    eval_dataset = CodeExplanationDataset(eval_data, tokenizer) if eval_data else None
+    if gradient_checkpointing:
+        # The decoder's key/value cache cannot be used with checkpointing
+        model.config.use_cache = False
     
     # Set up training arguments
     training_args = Seq2SeqTrainingArguments(
@@ -139,6 +530,10 @@ def train_model(
         num_train_epochs=num_train_epochs,
         per_device_train_batch_size=batch_size,
         per_device_eval_batch_size=batch_size,
+        gradient_accumulation_steps=gradient_accumulation_steps,
+        gradient_checkpointing=gradient_checkpointing,
+        group_by_length=group_by_length and not streaming,
+        max_steps=max_steps,
         warmup_steps=500,
         weight_decay=0.01,
         logging_dir=f"{output_dir}/logs",
@@ -146,13 +541,44 @@ def train_model(
         save_total_limit=2,
         learning_rate=learning_rate,
         predict_with_generate=True,
-        evaluation_strategy="epoch" if eval_dataset else "no"
+        evaluation_strategy="epoch" if eval_data_path else "no",
+        **_precision_kwargs(mixed_precision),
+        # Deeper prefetching smooths over bursts of disk reads when streaming
+        **_dataloader_kwargs(num_workers, prefetch_factor=4 if streaming else 2),
+        **_compile_kwargs(use_compile),
+        **_optimizer_kwargs(),
+        # T5 uses all of its parameters in every step
+        ddp_find_unused_parameters=False,
+        ddp_bucket_cap_mb=50
     )
     
-    # Create a data collator for seq2seq
+    # Load and tokenize the data, reusing the cached training set if there is
+    # one. When distributed, the main process builds the cache before the
+    # others load it.
+    with training_args.main_process_first(local=False, desc="tokenizing training data"):
+        if streaming:
+            train_dataset = CodeExplanationIterableDataset([train_data_path], tokenizer)
+        elif cache_dir:
+            train_dataset = load_cache(train_data_path, tokenizer, cache_dir)
+            if train_dataset is None:
+                train_dataset = build_cache(train_data_path, tokenizer, cache_dir, num_proc=os.cpu_count())
+        else:
+            train_dataset = CodeExplanationDataset(iter_training_data(train_data_path), tokenizer)
+    eval_dataset = CodeExplanationDataset(iter_training_data(eval_data_path), tokenizer) if eval_data_path else None
+    
+    # The data is tokenized by now. Keep the tokenizer's thread pool from being
+    # used after the workers fork, which would deadlock them.
+    if num_workers > 0:
+        os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    
+    # Create a data collator for seq2seq, which pads each batch to its longest
+    # sample and pads labels with -100 so the loss ignores them
     data_collator = DataCollatorForSeq2Seq(
         tokenizer=tokenizer,
-        model=model
+        model=model,
+        label_pad_token_id=-100,
+        padding="longest",
+        pad_to_multiple_of=PAD_TO_MULTIPLE_OF
     )
     
     # Create the trainer
@@ -168,11 +594,12 @@ def train_model(
     # Fine-tune the model
     trainer.train()
     
-    # Save the model and tokenizer
+    # Save the model and tokenizer; save_model only writes from the main
+    # process, and the tokenizer is saved from there too
     trainer.save_model(output_dir)
-    tokenizer.save_pretrained(output_dir)
-    
-    print(f"Model fine-tuning complete. Model saved to {output_dir}")
+    if trainer.is_world_process_zero():
+        tokenizer.save_pretrained(output_dir)
+        print(f"Model fine-tuning complete. Model saved to {output_dir}")
 
 
 def prepare_training_data_template():
@@ -0,0 +1,23 @@
+"""
+JSON encoding for API responses.
+
+orjson encodes the explanation dicts several times faster than the standard
+library, so it is used when installed. Without it, encoding falls back to the
+json module with the same output.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(payload) -> bytes:
+    """
+    Serialize a payload to UTF-8 JSON bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode('utf-8')
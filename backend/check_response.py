@@ -1,14 +1,53 @@
-import requests
+import argparse
+import asyncio
 import json
+import time
 
-response = requests.post('http://localhost:8000/explain/', json={
+import httpx
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+URL = 'http://localhost:8000/explain/'
+PAYLOAD = {
     'code': 'print("Hello World")',
     'language': 'python',
     'analysis_method': 'nlp',
     'model_name': 'gemini-1.5-flash'
-})
+}
+
+parser = argparse.ArgumentParser(description='Send explain requests to a running server.')
+parser.add_argument('--concurrency', type=int, default=1,
+                    help='number of requests to send at once (default: 1)')
+args = parser.parse_args()
+
+# Encode the request body once, and decode responses with orjson when installed
+BODY = orjson.dumps(PAYLOAD) if orjson is not None else json.dumps(PAYLOAD).encode('utf-8')
+loads = orjson.loads if orjson is not None else json.loads
+
+
+async def main():
+    # One client for the whole run, so connections are kept alive and reused
+    async with httpx.AsyncClient(timeout=None, headers={'Content-Type': 'application/json'}) as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[client.post(URL, content=BODY) for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - start
+    
+    response = responses[0]
+    result = loads(response.content)
+    print('Status:', response.status_code)
+    print('Response keys:', list(result.keys()))
+    print('Full Response:')
+    print(json.dumps(result, indent=2))
+    
+    if len(responses) > 1:
+        statuses = {}
+        for response in responses:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        print(f'\n{len(responses)} requests in {elapsed:.2f}s ({len(responses) / elapsed:.1f} req/s)')
+        print('Statuses:', statuses)
+
 
-print('Status:', response.status_code)
-print('Response keys:', list(response.json().keys()))
-print('Full Response:')
-print(json.dumps(response.json(), indent=2))
+asyncio.run(main())
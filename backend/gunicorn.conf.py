@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration for serving the backend in production.
+
+Usage (from the backend directory):
+    gunicorn -c gunicorn.conf.py
+"""
+
+import os
+
+wsgi_app = "run:app"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Threaded workers: rule-based requests are short and run in parallel, while
+# slow NLP and Gemini requests only tie up one thread instead of a process.
+# Each worker process loads its own copy of any NLP model it serves, so lower
+# WEB_CONCURRENCY on machines with limited memory.
+#
+# /explain/incremental/ keeps its editing sessions in the memory of the worker
+# that started them. With several workers, an edit that reaches another worker
+# gets a 404 and the client has to resend the full code. Serve that endpoint
+# from WEB_CONCURRENCY=1 (threads still handle concurrent requests), or route
+# requests to workers by session_id at the load balancer.
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Model inference can take a while on CPU
+timeout = 120
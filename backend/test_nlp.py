@@ -2,9 +2,18 @@
 
 """
 Test script for the NLP API
+
+Pass --gemini to also run a Gemini explanation, which calls the Gemini API
+and needs GEMINI_API_KEY to be set. Pass --concurrency N to also time N
+explanations run at once, which the local model batches together.
 """
 
-from app.nlp.api import analyze_code_nlp
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.nlp.api import analyze_code_nlp, analyze_code_nlp_batch
 
 # Simple test code
 test_code = '''
@@ -13,10 +22,62 @@ def hello():
     return "Hello, world!"
 '''
 
-# Test the API
+test_snippets = [
+    (test_code, 'python'),
+    ('''
+def add(a, b):
+    return a + b
+''', 'python'),
+    ('''
+function greet(name) {
+    return `Hello, ${name}!`;
+}
+''', 'javascript')
+]
+
+# Test the API, explaining all snippets in one batch
 print("Testing NLP API...")
-result = analyze_code_nlp(test_code, 'python')
+start = time.perf_counter()
+results = analyze_code_nlp_batch(test_snippets)
+elapsed = time.perf_counter() - start
+
+# Print the results
+for (code, language), result in zip(test_snippets, results):
+    print(f"\nResult ({language}):")
+    print(result)
+print(f"\n{len(results)} explanations in {elapsed:.2f}s")
 
-# Print the result
-print("\nResult:")
-print(result) 
\ No newline at end of file
+if "--concurrency" in sys.argv:
+    concurrency = int(sys.argv[sys.argv.index("--concurrency") + 1])
+    
+    async def run_concurrently():
+        # Vary the code so the requests are not answered from the result cache
+        loop = asyncio.get_event_loop()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return await asyncio.gather(*[
+                loop.run_in_executor(executor, analyze_code_nlp, f"{test_code}\n# request {i}", 'python')
+                for i in range(concurrency)
+            ])
+    
+    print(f"\nRunning {concurrency} explanations at once...")
+    start = time.perf_counter()
+    results = asyncio.run(run_concurrently())
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} explanations in {elapsed:.2f}s ({len(results) / elapsed:.1f}/s)")
+
+if "--gemini" in sys.argv:
+    from app.nlp.gemini_analyzer import analyze_code_with_gemini
+    
+    gemini_test_code = """
+def calculate_fibonacci(n):
+    if n <= 1:
+        return n
+    return calculate_fibonacci(n-1) + calculate_fibonacci(n-2)
+
+print(calculate_fibonacci(10))
+"""
+    
+    print("\nTesting Gemini analyzer...")
+    result = analyze_code_with_gemini(gemini_test_code, "python")
+    print("Summary:", result["summary"])
+    print("\nFull Explanation:", result["full_explanation"])
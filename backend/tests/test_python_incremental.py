@@ -0,0 +1,94 @@
+"""
+Tests that incremental re-analysis of edited Python code always matches a full analysis.
+
+Run from the backend directory with: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import unittest
+import warnings
+
+# Add the backend directory to the path so we can import the analyzers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.analyzers.python_analyzer import analyze_python
+from app.analyzers.python_incremental import PythonSession
+
+# Top-level statements random programs are built from
+STATEMENTS = [
+    "import os",
+    "from sys import path as p",
+    "x = 1",
+    "def f(a):\n    return a",
+    "class C:\n    def m(self):\n        pass",
+    "@dec\ndef g():\n    pass",
+    "if x:\n    y = 2",
+    "# comment",
+    "",
+    "for i in range(3):\n    print(i)",
+    "z = (1,\n     2)",
+    "async def h():\n    await q",
+    "s = 'abc'",
+]
+
+# Text inserted by random edits; empty strings make deletions more likely
+INSERTIONS = [
+    "\n", " ", "    ", "\t", "@dec\n", "def ", ":", "(", ")", ")\n", "x", "pass", "\n    ",
+    "import re\n", "class D:\n    pass\n", "#", "'", '"""', "\\", "\\\n", "else:\n    pass\n",
+    "elif x:\n", "from __future__ import annotations\n",
+] + [""] * 8
+
+
+def _random_edit(rng, code):
+    start = rng.randint(0, len(code))
+    end = min(len(code), start + rng.choice([0, 0, 1, 1, 2, 5, 20]))
+    return {"start": start, "end": end, "text": rng.choice(INSERTIONS)}
+
+
+def _apply(code, edits):
+    for edit in edits:
+        code = code[:edit["start"]] + edit["text"] + code[edit["end"]:]
+    return code
+
+
+class PythonSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        # Random edits produce invalid escapes and literals the parser warns about
+        warnings.simplefilter("ignore", SyntaxWarning)
+        self.addCleanup(warnings.resetwarnings)
+        
+    def assertMatchesFullAnalysis(self, code, edits):
+        session = PythonSession(code)
+        session.analyze()
+        self.assertEqual(session.apply_edits(edits), analyze_python(_apply(code, edits)))
+        
+    def test_deleted_newline_joins_next_statement(self):
+        self.assertMatchesFullAnalysis("import os\nfrom sys import path as p\nx = 1", [{"start": 9, "end": 10, "text": ""}])
+        self.assertMatchesFullAnalysis("# c\no", [{"start": 3, "end": 4, "text": "#"}])
+        
+    def test_insertion_at_start_of_next_statement(self):
+        code = "x = 1\ny = 2\nz = 3\n"
+        self.assertMatchesFullAnalysis(code, [{"start": 0, "end": 0, "text": "# c\n"}, {"start": 16, "end": 16, "text": "    "}])
+        
+    def test_line_continuation_into_changed_line(self):
+        self.assertMatchesFullAnalysis("s \\\n ", [{"start": 4, "end": 5, "text": ""}])
+        
+    def test_random_edits_match_full_analysis(self):
+        rng = random.Random(0)
+        for _ in range(1000):
+            code = "\n".join(rng.choice(STATEMENTS) for _ in range(rng.randint(1, 8))) + rng.choice(["", "\n"])
+            session = PythonSession(code)
+            session.analyze()
+            for _ in range(5):
+                edits = []
+                for _ in range(rng.choice([1, 1, 2, 3])):
+                    edits.append(_random_edit(rng, _apply(code, edits)))
+                code = _apply(code, edits)
+                self.assertEqual(session.apply_edits(edits), analyze_python(code), (code, edits))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Tests that the simplified analyzers describe code as they did before they
+shared the full analyzers' pattern table.
+
+Run from the backend directory with: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+# Add the backend directory to the path so we can import the analyzers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.analyzers.cpp_analyzer_simple import analyze_cpp
+from app.analyzers.java_analyzer_simple import analyze_java
+from app.analyzers.js_analyzer_simple import analyze_javascript
+
+# (code, full explanation of the original standalone simplified analyzer)
+CPP_CASES = [
+    ('// handled elsewhere\nint main(){return 0;}',
+     'This code contains a main function (entry point). This code defines functions.'),
+    ('do {\n  x--;\n}',
+     'This appears to be a simple C++ code snippet.'),
+    ('#include <cstdio>\nstruct Point { int x; };\nint main() {\n  for (;;) printf("x");\n}',
+     'This C++ code includes header files. This code defines classes or structures. '
+     'This code contains a main function (entry point). This code defines functions. '
+     'This code contains loops. This code performs output operations.'),
+    ('switch(k) { default: break; }',
+     'This code contains conditional logic.'),
+    ('if (x) { y(); } else { z(); }',
+     'This code contains conditional logic.'),
+]
+
+JAVA_CASES = [
+    ('// handled elsewhere\nclass A {}',
+     'This code defines Java classes.'),
+    ('do { i++; }',
+     'This appears to be a simple Java code snippet.'),
+    ('package a.b;\nimport java.util.List;\npublic class A {\n'
+     '  public static void main(String[] args) {}\n  private int f() { return 1; }\n}',
+     'This Java code belongs to a package. This code imports Java libraries or classes. '
+     'This code defines Java classes. This code contains a main method (entry point). '
+     'This code defines methods.'),
+    ('if (x) {} else {}',
+     'This code contains conditional logic.'),
+]
+
+JS_CASES = [
+    ('// handled elsewhere\nconsole.log(1);',
+     'This appears to be a simple JavaScript code snippet.'),
+    ('x.forEach(f);',
+     'This code contains loops or iterations.'),
+    ('const f = () => 1;\nimport a from "b";\nlet y = 2;',
+     'This JavaScript code contains function definitions. This code imports modules or dependencies. '
+     'This code declares variables.'),
+    ('switch (k) {}',
+     'This code contains conditional logic.'),
+    ('if (a) {} else {}',
+     'This code contains conditional logic.'),
+]
+
+
+class SimpleAnalyzerTest(unittest.TestCase):
+
+    def assertExplains(self, analyze, cases):
+        for code, expected in cases:
+            with self.subTest(code=code):
+                self.assertEqual(analyze(code)["full_explanation"], expected)
+                
+    def test_cpp_matches_original(self):
+        self.assertExplains(analyze_cpp, CPP_CASES)
+        
+    def test_java_matches_original(self):
+        self.assertExplains(analyze_java, JAVA_CASES)
+        
+    def test_javascript_matches_original(self):
+        self.assertExplains(analyze_javascript, JS_CASES)
+
+
+if __name__ == "__main__":
+    unittest.main()